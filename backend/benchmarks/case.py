@@ -0,0 +1,140 @@
+"""
+One benchmark case: a synthetic dataset of a given size, benchmarked in this process.
+
+Reads MSME_DATA_DIR / MSME_MODEL_DIR from the environment (set by benchmarks.run),
+so the service modules below must only be imported after they are set.
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+
+def measure(fn, repeat=5, warmup=1, max_seconds=20.0):
+    """Wall-clock stats in ms for `fn()`; stops repeating once `max_seconds` is spent."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    spent = 0.0
+    while len(times) < repeat and (not times or spent < max_seconds):
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+        spent += times[-1] / 1000
+    return {
+        "n": len(times),
+        "min_ms": round(min(times), 3),
+        "median_ms": round(float(np.median(times)), 3),
+        "p95_ms": round(float(np.percentile(times, 95)), 3),
+        "mean_ms": round(float(np.mean(times)), 3),
+    }
+
+
+def engine_benchmarks(n_msmes):
+    from services import data_loader
+    from model.train import train_model
+    from model.predict import get_prediction_by_id, predict_records, query_predictions
+    from data import optimization_engine as opt
+    from data.scheme_engine import get_msme_schemes, build_recommendations
+    from services.eligibility import get_scheme_index
+
+    msme_df = data_loader.load_msme_data()
+    record = msme_df.iloc[n_msmes // 2].to_dict()
+    msme_id = record['MSME_ID']
+    batch = msme_df.head(10000).drop(columns=['Growth_Category']).to_dict('records')
+    budget = float(msme_df['Annual_Revenue'].sum() * 0.01)
+
+    def reload_from_cache():
+        with data_loader._store_lock:
+            data_loader._store.clear()
+        data_loader.load_msme_data()
+
+    def candidates_cold():
+        opt.build_candidates(*opt.load_data())
+
+    return [
+        ("data_loader.load_from_parquet_cache", reload_from_cache, {}),
+        ("model.train_model", train_model, {"repeat": 1, "warmup": 0}),
+        ("model.get_prediction_by_id", lambda: get_prediction_by_id(msme_id), {"repeat": 200}),
+        ("model.predict_records[1]", lambda: predict_records(batch[:1]), {"repeat": 50}),
+        (f"model.predict_records[{len(batch)}]", lambda: predict_records(batch), {}),
+        ("model.query_predictions[filter+sort]",
+         lambda: query_predictions({'sector': 'Retail'}, None, 40, None, '-Growth_Score', None), {}),
+        ("scheme.get_msme_schemes", lambda: get_msme_schemes(record), {"repeat": 200}),
+        ("scheme.build_recommendations",
+         lambda: build_recommendations(msme_df, data_loader.load_scheme_data(), get_scheme_index()), {}),
+        ("optimization.build_candidates", candidates_cold, {}),
+        ("optimization.run_optimization[greedy]", lambda: opt.run_optimization(budget, 0.5, 0.5), {}),
+        ("optimization.run_optimization[exact]",
+         lambda: opt.run_optimization(budget, 0.5, 0.5, solver='exact'), {"repeat": 3}),
+        ("optimization.budget_frontier[50]",
+         lambda: opt.budget_frontier([budget * (i + 1) / 25 for i in range(50)], 0.5, 0.5), {}),
+        ("optimization.generate_tradeoff_curve[11]", lambda: opt.generate_tradeoff_curve(budget, 11), {"repeat": 3}),
+    ]
+
+
+def http_benchmarks(n_msmes):
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.data_loader import load_msme_data
+
+    client = TestClient(app)
+    msme_df = load_msme_data()
+    msme_id = msme_df['MSME_ID'].iloc[n_msmes // 2]
+    ids = msme_df['MSME_ID'].head(100).tolist()
+    record = msme_df.iloc[0].drop(labels=['Growth_Category']).to_dict()
+    budget = float(msme_df['Annual_Revenue'].sum() * 0.01)
+    misses = iter(range(1, 1_000_000))
+
+    def get(path, **params):
+        response = client.get(path, params=params)
+        response.raise_for_status()
+
+    def post(path, payload):
+        response = client.post(path, json=payload)
+        response.raise_for_status()
+
+    return [
+        ("http.GET /msmes?limit=100", lambda: get("/msmes", limit=100, sort="-Growth_Score"), {"repeat": 50}),
+        ("http.GET /msme/{id}", lambda: get(f"/msme/{msme_id}"), {"repeat": 100}),
+        ("http.GET /msme/{id}/schemes", lambda: get(f"/msme/{msme_id}/schemes"), {"repeat": 100}),
+        ("http.GET /optimize[cache miss]", lambda: get("/optimize", budget=budget + next(misses)), {}),
+        ("http.GET /optimize[cache hit]", lambda: get("/optimize", budget=budget), {"repeat": 50}),
+        ("http.POST /predict[1]", lambda: post("/predict", record), {"repeat": 50}),
+        ("http.POST /schemes/batch[100]", lambda: post("/schemes/batch", {"ids": ids}), {"repeat": 20}),
+    ]
+
+
+def run_case(n_msmes, n_schemes, seed, skip=()):
+    from benchmarks.synthetic import write_dataset
+
+    started = time.perf_counter()
+    write_dataset(n_msmes, n_schemes, seed)
+    results = {"generate_dataset_s": round(time.perf_counter() - started, 3)}
+
+    for group in (engine_benchmarks, http_benchmarks):
+        for name, fn, options in group(n_msmes):
+            if any(pattern in name for pattern in skip):
+                continue
+            try:
+                results[name] = measure(fn, **options)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"  {name}: {results[name]}", flush=True)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one benchmark case (see benchmarks.run)")
+    parser.add_argument("--msmes", type=int, required=True)
+    parser.add_argument("--schemes", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", default="", help="Comma-separated substrings of benchmark names to skip")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    skip = [s for s in args.skip.split(",") if s]
+    results = run_case(args.msmes, args.schemes, args.seed, skip)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
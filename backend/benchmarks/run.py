@@ -0,0 +1,116 @@
+"""
+Scale benchmarks over synthetic datasets.
+
+    python -m benchmarks.run --msmes 1000,100000 --schemes 10,100
+    python -m benchmarks.run --full --output before.json
+    python -m benchmarks.run --compare before.json
+
+Every (MSMEs x schemes) case runs in its own process against its own data and model
+directory, so the bundled data and model are never touched. Results are written as
+JSON keyed by case and benchmark name for comparison across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+WORK_DIR = os.path.join(os.path.dirname(__file__), '.data')
+
+FULL_MSMES = [1000, 100000, 1000000]
+FULL_SCHEMES = [10, 100, 1000]
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_cases(msme_sizes, scheme_sizes, seed=0, skip=''):
+    cases = {}
+    for n_msmes in msme_sizes:
+        for n_schemes in scheme_sizes:
+            name = f"msmes={n_msmes},schemes={n_schemes}"
+            case_dir = os.path.join(WORK_DIR, f"m{n_msmes}_s{n_schemes}_seed{seed}")
+            env = dict(os.environ,
+                       MSME_DATA_DIR=case_dir,
+                       MSME_MODEL_DIR=os.path.join(case_dir, 'model'),
+                       PYTHONWARNINGS='ignore')
+            os.makedirs(env['MSME_MODEL_DIR'], exist_ok=True)
+
+            print(f"[{name}]", flush=True)
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+                output = tmp.name
+            try:
+                subprocess.run([sys.executable, '-m', 'benchmarks.case', '--msmes', str(n_msmes),
+                                '--schemes', str(n_schemes), '--seed', str(seed), '--skip', skip,
+                                '--output', output], cwd=BACKEND_DIR, env=env, check=True)
+                with open(output) as f:
+                    cases[name] = json.load(f)
+            except subprocess.CalledProcessError as e:
+                cases[name] = {"error": f"case exited with status {e.returncode}"}
+            finally:
+                os.remove(output)
+    return cases
+
+
+def compare(current, baseline, threshold):
+    """Print median-time ratios against a baseline run; returns the regressed benchmarks."""
+    regressions = []
+    for case, results in current['cases'].items():
+        base_results = baseline.get('cases', {}).get(case, {})
+        for name, stats in results.items():
+            base = base_results.get(name)
+            if not isinstance(stats, dict) or not isinstance(base, dict) or 'median_ms' not in stats or 'median_ms' not in base:
+                continue
+            ratio = stats['median_ms'] / base['median_ms'] if base['median_ms'] > 0 else float('inf')
+            flag = '  REGRESSION' if ratio > threshold else ''
+            print(f"{case:32} {name:48} {base['median_ms']:>11.3f} -> {stats['median_ms']:>11.3f} ms  x{ratio:.2f}{flag}")
+            if flag:
+                regressions.append((case, name, ratio))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scale benchmarks on synthetic MSME/scheme data")
+    parser.add_argument("--msmes", default="1000,100000", help="Comma-separated MSME counts")
+    parser.add_argument("--schemes", default="10,100", help="Comma-separated scheme counts")
+    parser.add_argument("--full", action="store_true", help=f"MSMEs {FULL_MSMES} x schemes {FULL_SCHEMES}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", default="", help="Comma-separated substrings of benchmark names to skip")
+    parser.add_argument("--output", help="Results JSON path (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare medians against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Median ratio counted as a regression")
+    args = parser.parse_args()
+
+    msme_sizes = FULL_MSMES if args.full else [int(n) for n in args.msmes.split(",")]
+    scheme_sizes = FULL_SCHEMES if args.full else [int(n) for n in args.schemes.split(",")]
+
+    commit = _commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "cases": run_cases(msme_sizes, scheme_sizes, args.seed, args.skip),
+    }
+
+    output = args.output or os.path.join(os.path.dirname(__file__), 'results', f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Value sets of the bundled workbooks
+SECTORS = ['Retail', 'IT', 'Agro-processing', 'Manufacturing', 'Services']
+OWNERSHIP_TYPES = ['Partnership', 'Pvt Ltd', 'Sole Proprietorship', 'LLP']
+CATEGORIES = ['Micro', 'Small', 'Medium']
+LOCATIONS = ['Urban', 'Semi-Urban', 'Rural']
+TECHNOLOGY_LEVELS = ['Low', 'Medium', 'High']
+LOCATION_RULES = ['Urban', 'Rural', 'Semi-Urban', 'Urban/Rural', 'All']
+SUBSIDY_CAPS = [1000000, 2000000, 3000000, 5000000, 7500000, 10000000]
+# Larger tables are written as Parquet instead of .xlsx
+XLSX_MAX_ROWS = 20_000
+
+
+def generate_msmes(n, seed=0):
+    """
+    `n` synthetic MSMEs with the MSME_Project_Data.xlsx schema and value ranges.
+    Growth_Category is split into tertiles of a noisy score over the growth drivers,
+    so a trained model has real signal to fit.
+    """
+    rng = np.random.default_rng(seed)
+    width = max(4, len(str(n)))
+    revenue = rng.integers(700000, 50000000, n)
+    debt = rng.integers(60000, 10000000, n)
+
+    df = pd.DataFrame({
+        'MSME_ID': [f"MSME_{i:0{width}d}" for i in range(1, n + 1)],
+        'Sector': rng.choice(SECTORS, n),
+        'Years_of_Operation': rng.integers(1, 25, n),
+        'Ownership_Type': rng.choice(OWNERSHIP_TYPES, n),
+        'Category': rng.choice(CATEGORIES, n),
+        'Location_Type': rng.choice(LOCATIONS, n),
+        'Annual_Revenue': revenue,
+        'Revenue_Growth_Rate': rng.uniform(-5, 30, n).round(2),
+        'Profit_Margin': rng.uniform(2, 25, n).round(2),
+        'Debt_Outstanding': debt,
+        'Number_of_Employees': rng.integers(5, 200, n),
+        'Capacity_Utilization': rng.integers(30, 100, n),
+        'Export_Percentage': rng.integers(0, 60, n),
+        'Technology_Level': rng.choice(TECHNOLOGY_LEVELS, n),
+        'GST_Compliance_Score': rng.integers(50, 100, n),
+        'Inspection_Score': rng.integers(40, 100, n),
+        'Documentation_Readiness_Score': rng.integers(50, 100, n),
+    })
+
+    signal = (df['Revenue_Growth_Rate'] / 35 + df['Profit_Margin'] / 25
+              + df['Capacity_Utilization'] / 100 + rng.normal(0, 0.3, n))
+    df['Growth_Category'] = pd.qcut(signal, 3, labels=['Low', 'Moderate', 'High']).astype(str)
+    df['Loan_to_Revenue_Ratio'] = (debt / revenue).round(3)
+    return df
+
+
+def generate_schemes(n, seed=0):
+    """`n` synthetic schemes with the Scheme_Dataset_Final.xlsx schema and rule syntax."""
+    rng = np.random.default_rng(seed + 1)
+
+    def sector_rule():
+        if rng.random() < 0.15:
+            return 'All'
+        return '/'.join(rng.choice(SECTORS, rng.integers(1, 3), replace=False))
+
+    return pd.DataFrame({
+        'Scheme_ID': [f"SCH_{i:02d}" for i in range(1, n + 1)],
+        'Scheme_Name': [f"Scheme {i}" for i in range(1, n + 1)],
+        'Eligible_Sectors': [sector_rule() for _ in range(n)],
+        'Max_Subsidy_Amount': rng.choice(SUBSIDY_CAPS, n),
+        'Target_Category': rng.choice(CATEGORIES + ['All'], n),
+        'Location_Criteria': rng.choice(LOCATION_RULES, n),
+        'Impact_Factor_Revenue (%)': rng.integers(5, 30, n),
+        'Impact_Factor_Employment (Jobs)': rng.integers(1, 15, n),
+    })
+
+
+def write_dataset(n_msmes, n_schemes, seed=0):
+    """
+    Write synthetic tables to the dataset paths of the current process (set
+    MSME_DATA_DIR first) and seed the Parquet cache, so the first load does not have
+    to parse them. Tables up to XLSX_MAX_ROWS rows are written as workbooks like the
+    bundled data; larger ones as Parquet, which the loader prefers and which does not
+    spend the run in openpyxl.
+    """
+    import os
+    from services.data_loader import DATA_DIR, TABLE_SOURCES, seed_cache
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    for name, df in (('msme', generate_msmes(n_msmes, seed)), ('schemes', generate_schemes(n_schemes, seed))):
+        ext = '.xlsx' if len(df) <= XLSX_MAX_ROWS else '.parquet'
+        # Only one source per table, or a stale one from an earlier size could take over
+        for source in TABLE_SOURCES[name]:
+            if os.path.exists(source):
+                os.remove(source)
+        path = next(source for source in TABLE_SOURCES[name] if source.endswith(ext))
+        if ext == '.xlsx':
+            df.to_excel(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+        seed_cache(name, df)
@@ -0,0 +1,198 @@
+import numpy as np
+import pandas as pd
+import time
+from math import gcd
+from functools import reduce
+
+# Largest DP table (MSMEs x budget units) the exact solver will allocate
+DP_MAX_CELLS = 20_000_000
+DEFAULT_TIME_LIMIT = 10.0
+
+SOLVERS = ('greedy', 'lp', 'exact')
+
+
+def prune_dominated(msme_rows, cost, score, budget):
+    """
+    Drop options no optimal solution would use: ones that cannot fit the budget, ones
+    with no positive score (funding nothing is free), and ones beaten by a cheaper or
+    equally priced option of the same MSME with at least the same score.
+    Returns candidate positions sorted by (MSME, cost), scores strictly increasing
+    with cost inside each MSME.
+    """
+    keep = np.flatnonzero((cost <= budget) & (score > 0))
+    keep = keep[np.lexsort((-score[keep], cost[keep], msme_rows[keep]))]
+
+    best_before = pd.Series(score[keep]).groupby(msme_rows[keep]).cummax().to_numpy()
+    best_before = np.concatenate(([-np.inf], best_before[:-1]))
+    first_in_group = np.concatenate(([True], msme_rows[keep][1:] != msme_rows[keep][:-1]))
+    best_before[first_in_group] = -np.inf
+    return keep[score[keep] > best_before]
+
+
+def _hull_increments(groups, cost, score):
+    """
+    Reduce each MSME's pruned options to the upper convex hull through (0, 0) and
+    return the hull points with the cost/score increments from the previous one.
+    """
+    idx = np.arange(len(groups))
+    while True:
+        g, c, s = groups[idx], cost[idx], score[idx]
+        first = np.concatenate(([True], g[1:] != g[:-1])) if len(idx) else np.array([], dtype=bool)
+        prev_c = np.where(first, 0, np.concatenate(([0], c[:-1])))
+        prev_s = np.where(first, 0.0, np.concatenate(([0.0], s[:-1])))
+        has_next = np.concatenate((~first[1:], [False])) if len(idx) else first
+        next_c = np.concatenate((c[1:], [0]))
+        next_s = np.concatenate((s[1:], [0.0]))
+
+        # A point is off the hull when it lies on or below the segment joining its neighbours
+        below = has_next & ((s - prev_s) * (next_c - prev_c) <= (next_s - prev_s) * (c - prev_c))
+        if not below.any():
+            return idx, c - prev_c, s - prev_s
+        idx = idx[~below]
+
+
+def lp_relaxation(groups, cost, score, budget):
+    """
+    Solve the LP relaxation of the multiple-choice knapsack over pruned options.
+
+    Returns (upper_bound, chosen) where `chosen` is the integral solution obtained by
+    dropping the single fractional increment, as positions into the option arrays.
+    """
+    hull, d_cost, d_score = _hull_increments(groups, cost, score)
+    if len(hull) == 0:
+        return 0.0, hull
+
+    with np.errstate(divide='ignore'):
+        efficiency = np.where(d_cost > 0, d_score / np.where(d_cost > 0, d_cost, 1), np.inf)
+    order = np.argsort(-efficiency, kind='stable')
+    cum_cost = np.cumsum(d_cost[order])
+    n_full = int(np.searchsorted(cum_cost, budget, side='right'))
+
+    bound = float(d_score[order[:n_full]].sum())
+    if n_full < len(order):
+        spare = budget - (cum_cost[n_full - 1] if n_full else 0)
+        bound += float(d_score[order[n_full]] * spare / d_cost[order[n_full]])
+
+    # Increments of one MSME come in hull order, so its last full increment is its choice
+    taken = np.sort(order[:n_full])
+    taken_groups = groups[hull[taken]]
+    is_last = np.concatenate((taken_groups[1:] != taken_groups[:-1], [True])) if len(taken) else taken_groups
+    return bound, hull[taken[is_last.astype(bool)]]
+
+
+def _budget_unit(cost, budget):
+    """GCD of the (whole-number) costs as an exact DP unit, or (None, whole) when there is none."""
+    whole = np.all(cost == np.floor(cost))
+    if whole and len(cost):
+        unit = reduce(gcd, np.unique(cost.astype(np.int64)).tolist())
+        if unit > 0:
+            return float(unit), True
+    return None, whole
+
+
+def dp_solve(groups, cost, score, budget, deadline):
+    """
+    Exact DP over the budget expressed in units of the GCD of all subsidy amounts.
+    When that table is too large the costs are rounded up to a coarser unit, which
+    keeps every solution feasible but is no longer guaranteed optimal.
+
+    Returns (chosen, exact, completed).
+    """
+    if len(groups) == 0:
+        return np.array([], dtype=np.int64), True, True
+    bounds = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1], [True])))
+    n_groups = len(bounds) - 1
+
+    unit, exact = _budget_unit(cost, budget)
+    if unit is None or n_groups * (budget // unit + 1) > DP_MAX_CELLS:
+        unit = max(budget / max(DP_MAX_CELLS // n_groups - 1, 1), 1.0)
+        exact = False
+    capacity = int(budget // unit)
+    weights = np.ceil(cost / unit - 1e-9).astype(np.int64)
+
+    # value[b]: best score using at most b units; choice[g, b]: option taken for group g (-1 = none)
+    value = np.zeros(capacity + 1)
+    choice = np.full((n_groups, capacity + 1), -1, dtype=np.int16)
+
+    for g in range(n_groups):
+        if time.perf_counter() > deadline:
+            return None, exact, False
+        best = value.copy()
+        for k in range(bounds[g], bounds[g + 1]):
+            w = weights[k]
+            if w > capacity:
+                break
+            shifted = np.full(capacity + 1, -np.inf)
+            shifted[w:] = value[:capacity + 1 - w] + score[k]
+            better = shifted > best
+            best[better] = shifted[better]
+            choice[g, better] = k - bounds[g]
+        value = best
+
+    chosen = []
+    remaining = int(np.argmax(value))
+    for g in range(n_groups - 1, -1, -1):
+        local = choice[g, remaining]
+        if local >= 0:
+            k = bounds[g] + local
+            chosen.append(k)
+            remaining -= weights[k]
+    return np.array(sorted(chosen), dtype=np.int64), exact, True
+
+
+def solve(candidates, score, budget, solver='exact', time_limit=DEFAULT_TIME_LIMIT, incumbent=None):
+    """
+    Solve the one-scheme-per-MSME budget allocation as a multiple-choice knapsack
+    maximizing total Optimization_Score.
+
+    solver='lp' returns the rounded LP relaxation; solver='exact' runs the budget DP
+    within `time_limit` seconds and falls back to the best of the LP rounding and
+    `incumbent` (e.g. the greedy selection) if it runs out of time.
+
+    Returns (selected candidate positions, info dict with objective, bound, gap and timing).
+    """
+    started = time.perf_counter()
+    msme_rows = candidates['msme_rows']
+    cost = candidates['Subsidy_Cost']
+
+    options = prune_dominated(msme_rows, cost, score, budget)
+    groups, o_cost, o_score = msme_rows[options], cost[options], score[options]
+
+    upper_bound, lp_chosen = lp_relaxation(groups, o_cost, o_score, budget)
+    best = options[lp_chosen]
+    status = 'feasible'
+
+    if solver == 'exact':
+        chosen, exact, completed = dp_solve(groups, o_cost, o_score, budget, started + time_limit)
+        if completed:
+            dp_best = options[chosen]
+            if score[dp_best].sum() >= score[best].sum():
+                best = dp_best
+            status = 'optimal' if exact else 'feasible'
+        else:
+            status = 'time_limit'
+
+    # Rounded-up DP costs are feasible by construction; guard against float slack anyway
+    if cost[best].sum() > budget:
+        best = options[lp_chosen]
+        status = 'feasible'
+
+    if incumbent is not None and len(incumbent) and score[incumbent].sum() > score[best].sum():
+        best = np.sort(incumbent)
+
+    objective = float(score[best].sum())
+    if objective >= upper_bound - 1e-9 * max(1.0, abs(upper_bound)):
+        status = 'optimal'
+    proven_bound = objective if status == 'optimal' else upper_bound
+    gap = (proven_bound - objective) / proven_bound if proven_bound > 0 else 0.0
+
+    return best, {
+        "name": solver,
+        "status": status,
+        "objective": objective,
+        "upper_bound": proven_bound,
+        "lp_bound": upper_bound,
+        "optimality_gap": max(gap, 0.0),
+        "options_after_pruning": int(len(options)),
+        "solve_time_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
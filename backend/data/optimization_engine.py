@@ -1,52 +1,223 @@
+import numpy as np
 import pandas as pd
 import argparse
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from services.data_loader import load_msme_data, load_scheme_data
+from services.eligibility import get_scheme_index, eligible_pairs
+from services.instrumentation import stage
+from data import knapsack_solver
+
+MAX_CACHED_RANKINGS = 32
+
+# Columns of the allocation and rejected rows in /optimize responses
+ALLOCATION_COLUMNS = ['MSME_ID', 'Sector', 'Scheme_Name', 'Optimization_Score', 'Subsidy_Cost', 'Before_Revenue', 'After_Revenue', 'Jobs_Created']
+REJECTED_COLUMNS = ['MSME_ID', 'Sector', 'Scheme_Name', 'Optimization_Score', 'Reason']
+
+# Tradeoff sweeps smaller than this many (candidate x weight) evaluations run in-process
+SWEEP_PARALLEL_MIN_WORK = 2_000_000
+
+# Candidate pairs for the current (MSME, scheme) frames plus the rankings already
+# computed for them, keyed by (w_rev, w_emp). The dataset store hands out a new
+# frame object per data version, so the frames themselves key the cache.
+_candidate_cache = {'frames': None, 'candidates': None, 'rankings': OrderedDict()}
+_candidate_lock = threading.Lock()
 
 def load_data():
-    project_data_path = os.path.join(os.path.dirname(__file__), 'MSME_PROJECT_DATA.xlsx')
-    scheme_data_path = os.path.join(os.path.dirname(__file__), 'SCHEME_DATASET_FINAL.xlsx')
+    return load_msme_data(), load_scheme_data()
+
+def build_candidates(msme_df, scheme_df):
+    """
+    Build every eligible MSME -> Scheme pair as parallel NumPy arrays, in the same
+    order a nested loop over (MSME rows, scheme rows) would produce them.
+    """
+    msme_rows, scheme_rows = eligible_pairs(get_scheme_index(scheme_df), msme_df)
     
-    msme_df = pd.read_excel(project_data_path)
-    scheme_df = pd.read_excel(scheme_data_path)
-    return msme_df, scheme_df
+    rev_impact = scheme_df['Impact_Factor_Revenue (%)'].fillna(0).to_numpy()[scheme_rows]
+    before_rev = msme_df['Annual_Revenue'].to_numpy()[msme_rows]
+    rev_increase = before_rev * (rev_impact / 100)
+    
+    return {
+        'msme_rows': msme_rows,
+        'scheme_rows': scheme_rows,
+        'n_msmes': len(msme_df),
+        'Subsidy_Cost': scheme_df['Max_Subsidy_Amount'].fillna(0).to_numpy()[scheme_rows],
+        'Rev_Increase': rev_increase,
+        'Jobs_Created': scheme_df['Impact_Factor_Employment (Jobs)'].fillna(0).to_numpy()[scheme_rows],
+        'Before_Revenue': before_rev,
+        'After_Revenue': before_rev + rev_increase,
+    }
 
-def check_eligibility(msme, scheme):
-    sector_match = scheme['Eligible_Sectors'] == 'All' or msme['Sector'] in scheme['Eligible_Sectors']
-    cat_match = scheme['Target_Category'] == 'All' or msme['Category'] == scheme['Target_Category']
-    loc_match = scheme['Location_Criteria'] == 'All' or scheme['Location_Criteria'] == 'Urban/Rural' or msme['Location_Type'] == scheme['Location_Criteria']
+def score_candidates(candidates, w_rev, w_emp):
+    """Weighted Optimization_Score and Score_per_Cost for every candidate pair."""
+    # Normalize features for accurate weighted scoring (Min-Max Scaling)
+    max_rev = candidates['Rev_Increase'].max() or 1
+    max_emp = candidates['Jobs_Created'].max() or 1
+    
+    norm_rev = candidates['Rev_Increase'] / max_rev
+    norm_emp = candidates['Jobs_Created'] / max_emp
     
-    return sector_match and cat_match and loc_match
+    score = (norm_rev * w_rev) + (norm_emp * w_emp)
+    cost = candidates['Subsidy_Cost']
+    score_per_cost = score / np.where(cost == 0, 1, cost)
+    return score, score_per_cost
 
-def run_optimization(budget, w_rev, w_emp):
+def rank_candidates(score_per_cost):
+    """
+    Candidate positions by descending Score_per_Cost, ties in candidate order. The
+    tie order is part of the contract: ranking any subset of the candidates gives
+    the same relative order as ranking all of them (data.scenarios relies on this).
+    """
+    return np.argsort(-np.asarray(score_per_cost), kind='stable')
+
+def get_candidate_snapshot():
+    """
+    (msme_df, scheme_df, candidates) from one dataset snapshot, so candidate rows always
+    index the frames they are returned with, even if a dataset reloads in between.
+    Candidates are rebuilt only when either dataset changes.
+    """
     msme_df, scheme_df = load_data()
+    with _candidate_lock:
+        frames = _candidate_cache['frames']
+        if frames is None or frames[0] is not msme_df or frames[1] is not scheme_df:
+            _candidate_cache['candidates'] = build_candidates(msme_df, scheme_df)
+            _candidate_cache['rankings'] = OrderedDict()
+            _candidate_cache['frames'] = (msme_df, scheme_df)
+        return msme_df, scheme_df, _candidate_cache['candidates']
+
+def get_candidates():
+    """Candidate arrays for the current datasets (see get_candidate_snapshot)."""
+    return get_candidate_snapshot()[2]
+
+def get_ranking(candidates, w_rev, w_emp):
+    """(score, order) for the given policy weights, memoized per candidate set."""
+    key = (w_rev, w_emp)
+    with _candidate_lock:
+        rankings = _candidate_cache['rankings'] if _candidate_cache['candidates'] is candidates else None
+        if rankings is not None and key in rankings:
+            rankings.move_to_end(key)
+            return rankings[key]
+    
+    score, score_per_cost = score_candidates(candidates, w_rev, w_emp)
+    ranking = (score, rank_candidates(score_per_cost))
+    
+    if rankings is not None:
+        with _candidate_lock:
+            rankings[key] = ranking
+            while len(rankings) > MAX_CACHED_RANKINGS:
+                rankings.popitem(last=False)
+    return ranking
+
+def greedy_select(candidates, order, budget, start=0, funded_at=None):
+    """
+    One-scheme-per-MSME greedy budget pass over candidates taken in `order`.
+    
+    Equivalent to walking the ranked list and funding each pair whose MSME is still
+    unfunded while the remaining budget covers it, but done in vectorized batches:
+    each batch funds the first affordable pair of every unfunded MSME up to the point
+    where the running budget no longer covers one of them. Every batch ends by making
+    some subsidy amount unaffordable, so the loop runs at most once per distinct cost.
+    
+    To resume a partial pass, give the sequence position to continue from, the budget
+    still available there, and `funded_at` (sequence position at which each MSME was
+    funded, len(order) for unfunded ones).
     
+    Returns (selected, rejected, remaining) with positions into the candidate arrays.
+    """
+    msme_seq = candidates['msme_rows'][order]
+    cost_seq = candidates['Subsidy_Cost'][order]
+    n = len(order)
+    
+    funded_at = np.full(candidates['n_msmes'], n) if funded_at is None else funded_at.copy()
+    remaining = budget
+    selected, rejected = [], []
+    
+    while start < n:
+        pos = start + np.flatnonzero(funded_at[msme_seq[start:]] == n)
+        if len(pos) == 0:
+            break
+        msmes = msme_seq[pos]
+        
+        # First pair per MSME that the current budget could cover at all
+        affordable = np.flatnonzero(cost_seq[pos] <= remaining)
+        _, first = np.unique(msmes[affordable], return_index=True)
+        first_pos = pos[affordable[np.sort(first)]]
+        
+        # Running budget before each of those pairs (sequential, like `current_budget -= cost`)
+        budget_before = np.subtract.accumulate(np.concatenate(([remaining], cost_seq[first_pos])))
+        fits = budget_before[:-1] >= cost_seq[first_pos]
+        stop = len(fits) if fits.all() else int(np.argmin(fits))
+        end = first_pos[stop] if stop < len(fits) else n
+        
+        funded = first_pos[:stop]
+        funded_at[msme_seq[funded]] = funded
+        remaining = budget_before[stop].item()
+        
+        # Pairs seen before `end` whose MSME was not yet funded at that point were rejected
+        seen = pos[pos < end]
+        rejected.append(seen[funded_at[msme_seq[seen]] > seen])
+        selected.append(funded)
+        if end < n:
+            rejected.append([end])
+        start = end + 1
+    
+    selected = order[np.concatenate(selected)] if selected else np.array([], dtype=np.int64)
+    rejected = order[np.concatenate(rejected).astype(np.int64)] if rejected else np.array([], dtype=np.int64)
+    return selected, rejected, remaining
+
+def _rank_order_solution(candidates, order, selected, budget):
+    """
+    Present a solver's selection like the greedy pass: allocations in ranking order,
+    and each eligible but unfunded MSME rejected on its best-ranked pair.
+    """
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    selected = selected[np.argsort(rank[selected], kind='stable')]
+    
+    funded = np.zeros(candidates['n_msmes'], dtype=bool)
+    funded[candidates['msme_rows'][selected]] = True
+    msme_seq = candidates['msme_rows'][order]
+    _, first = np.unique(msme_seq, return_index=True)
+    first = np.sort(first)
+    rejected = order[first[~funded[msme_seq[first]]]]
+    
+    return selected, rejected, budget - candidates['Subsidy_Cost'][selected].sum().item()
+
+def _rejection_reasons(rejected_score):
+    return np.where(rejected_score < 0.3, "Policy priority mismatch",
+                    np.where(rejected_score < 0.5, "Lower weighted score", "Budget exhausted")).astype(object)
+
+def summarize_rejections(reasons, sectors, costs):
+    """Rejected pairs counted per (reason, sector) with the subsidy they asked for."""
+    if len(reasons) == 0:
+        return []
+    grouped = pd.DataFrame({'Reason': reasons, 'Sector': sectors, 'Subsidy_Cost': costs}).groupby(
+        ['Reason', 'Sector'], sort=True).agg(Count=('Subsidy_Cost', 'size'), Requested_Subsidy=('Subsidy_Cost', 'sum'))
+    return grouped.reset_index().to_dict(orient='records')
+
+def run_optimization(budget, w_rev, w_emp, solver='greedy', time_limit=knapsack_solver.DEFAULT_TIME_LIMIT,
+                     layout='rows', rejections='full', rejected_offset=0, rejected_limit=None):
+    """
+    Allocate at most one scheme per MSME within `budget`, maximizing the weighted score.
+    solver='greedy' is the score-per-cost pass; 'lp' and 'exact' solve the multiple-choice
+    knapsack (see knapsack_solver) and add a "solver" block with bound, gap and timing.
+    
+    layout='columns' returns allocations and rejected rows as column arrays instead
+    of one dict per row. rejections='summary' replaces the full rejected list with
+    counts per (reason, sector) plus the detail rows in
+    [rejected_offset, rejected_offset + rejected_limit) of the full list (none by default).
+    """
+    if solver not in knapsack_solver.SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}', expected one of {', '.join(knapsack_solver.SOLVERS)}")
+    if layout not in ('rows', 'columns'):
+        raise ValueError(f"Unknown layout '{layout}', expected rows or columns")
+    if rejections not in ('full', 'summary'):
+        raise ValueError(f"Unknown rejections mode '{rejections}', expected full or summary")
     # 1. Generate all eligible allocations (MSME -> Scheme match)
-    allocations = []
-    
-    for _, msme in msme_df.iterrows():
-        for _, scheme in scheme_df.iterrows():
-            if check_eligibility(msme, scheme):
-                
-                # Retrieve impact factors
-                rev_impact = scheme['Impact_Factor_Revenue (%)'] if pd.notnull(scheme['Impact_Factor_Revenue (%)']) else 0
-                emp_impact = scheme['Impact_Factor_Employment (Jobs)'] if pd.notnull(scheme['Impact_Factor_Employment (Jobs)']) else 0
-                cost = scheme['Max_Subsidy_Amount'] if pd.notnull(scheme['Max_Subsidy_Amount']) else 0
-                
-                # Calculate absolute projected revenue increase
-                before_rev = msme['Annual_Revenue']
-                rev_increase = before_rev * (rev_impact / 100)
-                
-                allocations.append({
-                    'MSME_ID': msme['MSME_ID'],
-                    'Sector': msme['Sector'],
-                    'Scheme_Name': scheme['Scheme_Name'],
-                    'Scheme_ID': scheme['Scheme_ID'],
-                    'Subsidy_Cost': cost,
-                    'Rev_Increase': rev_increase,
-                    'Jobs_Created': emp_impact,
-                    'Before_Revenue': before_rev,
-                    'After_Revenue': before_rev + rev_increase
-                })
+    with stage('optimize.candidates'):
+        msme_df, scheme_df, candidates = get_candidate_snapshot()
 
     empty_response = {
         "summary": {
@@ -56,121 +227,250 @@ def run_optimization(budget, w_rev, w_emp):
             "Total_MSMEs_Funded": 0,
             "Total_Projected_Jobs_Created": 0
         },
-        "allocations": [],
-        "rejected": [],
+        "allocations": _empty_layout(ALLOCATION_COLUMNS, layout),
+        "rejected": _empty_layout(REJECTED_COLUMNS, layout),
         "sector_stats": []
     }
+    if rejections == 'summary':
+        empty_response.update(rejected_summary=[], rejected_page={"offset": rejected_offset, "limit": rejected_limit or 0, "total": 0})
 
-    if not allocations:
+    if len(candidates['msme_rows']) == 0:
         return empty_response
 
-    alloc_df = pd.DataFrame(allocations)
-    
-    # Normalize features for accurate weighted scoring (Min-Max Scaling)
-    max_rev = alloc_df['Rev_Increase'].max() or 1
-    max_emp = alloc_df['Jobs_Created'].max() or 1
-    
-    alloc_df['Norm_Rev'] = alloc_df['Rev_Increase'] / max_rev
-    alloc_df['Norm_Emp'] = alloc_df['Jobs_Created'] / max_emp
-    
-    # Calculate composite Weighted Score based on user policy weights
-    alloc_df['Optimization_Score'] = (alloc_df['Norm_Rev'] * w_rev) + (alloc_df['Norm_Emp'] * w_emp)
-    
     # Sort by the best Score per unit cost (Knapsack value density approximation)
-    alloc_df['Score_per_Cost'] = alloc_df['Optimization_Score'] / alloc_df['Subsidy_Cost'].replace(0, 1)
-    alloc_df = alloc_df.sort_values(by='Score_per_Cost', ascending=False)
+    with stage('optimize.rank'):
+        score, order = get_ranking(candidates, w_rev, w_emp)
     
     # 2. Greedily enforce budget constraints to pick best allocations (1 scheme per MSME max)
-    selected_allocations = []
-    rejected_allocations = []
-    current_budget = budget
-    allocated_msmes = set()
-    
-    for _, alloc in alloc_df.iterrows():
-        msme_id = alloc['MSME_ID']
-        cost = alloc['Subsidy_Cost']
-        score = alloc['Optimization_Score']
-        
-        if msme_id in allocated_msmes:
-            continue
-            
-        if current_budget >= cost:
-            selected_allocations.append(alloc)
-            current_budget -= cost
-            allocated_msmes.add(msme_id)
-        else:
-            # Determine reason for rejection
-            if score < 0.3:
-                reason = "Policy priority mismatch"
-            elif score < 0.5:
-                reason = "Lower weighted score"
-            else:
-                reason = "Budget exhausted"
-                
-            rejected_dict = {
-                'MSME_ID': msme_id,
-                'Sector': alloc['Sector'],
-                'Scheme_Name': alloc['Scheme_Name'],
-                'Optimization_Score': score,
-                'Reason': reason
-            }
-            rejected_allocations.append(rejected_dict)
+    with stage('optimize.greedy'):
+        selected, rejected, current_budget = greedy_select(candidates, order, budget)
+    
+    solver_info = None
+    if solver != 'greedy':
+        # The greedy pick doubles as the solver's best-so-far fallback
+        with stage(f'optimize.solver.{solver}'):
+            selected, solver_info = knapsack_solver.solve(candidates, score, budget, solver, time_limit, incumbent=selected)
+            selected, rejected, current_budget = _rank_order_solution(candidates, order, selected, budget)
+        empty_response["solver"] = solver_info
             
     # 3. Output logic matching Phase 4 and Phase 5 specifications
-    if not selected_allocations:
+    if len(selected) == 0:
         return empty_response
+    
+    with stage('optimize.response'):
+        msme_ids = msme_df['MSME_ID'].to_numpy()
+        sectors = np.asarray(msme_df['Sector'], dtype=object)
+        scheme_names = scheme_df['Scheme_Name'].to_numpy()
+    
+        final_df = pd.DataFrame({
+            'MSME_ID': msme_ids[candidates['msme_rows'][selected]],
+            'Sector': sectors[candidates['msme_rows'][selected]],
+            'Scheme_Name': scheme_names[candidates['scheme_rows'][selected]],
+            'Optimization_Score': score[selected],
+            'Subsidy_Cost': candidates['Subsidy_Cost'][selected],
+            'Before_Revenue': candidates['Before_Revenue'][selected],
+            'After_Revenue': candidates['After_Revenue'][selected],
+            'Jobs_Created': candidates['Jobs_Created'][selected],
+            'Rev_Increase': candidates['Rev_Increase'][selected],
+        })
+        output_df = final_df[ALLOCATION_COLUMNS]
+    
+        rejected_summary = None
+        if rejections == 'summary':
+            rejected_summary = summarize_rejections(_rejection_reasons(score[rejected]),
+                                                    sectors[candidates['msme_rows'][rejected]],
+                                                    candidates['Subsidy_Cost'][rejected])
+            rejected_total = len(rejected)
+            rejected = rejected[rejected_offset:rejected_offset + (rejected_limit or 0)]
         
-    final_df = pd.DataFrame(selected_allocations)
-    output_df = final_df[['MSME_ID', 'Sector', 'Scheme_Name', 'Optimization_Score', 'Subsidy_Cost', 'Before_Revenue', 'After_Revenue', 'Jobs_Created']]
-    
-    # Calculate sector-wise summary stats
-    grouped = final_df.groupby('Sector').agg(
-        Allocated_Budget=('Subsidy_Cost', 'sum'),
-        Revenue_Gain=('Rev_Increase', 'sum'),
-        Jobs_Created=('Jobs_Created', 'sum'),
-        MSMEs_Funded=('MSME_ID', 'count')
-    ).reset_index()
-    sector_stats = grouped.to_dict(orient='records')
-    
-    # Return a dictionary suitable for JSON serialization
+        # Determine reason for rejection
+        rejected_score = score[rejected]
+        rejected_df = pd.DataFrame({
+            'MSME_ID': msme_ids[candidates['msme_rows'][rejected]],
+            'Sector': sectors[candidates['msme_rows'][rejected]],
+            'Scheme_Name': scheme_names[candidates['scheme_rows'][rejected]],
+            'Optimization_Score': rejected_score,
+            'Reason': _rejection_reasons(rejected_score),
+        })
+    
+        # Calculate sector-wise summary stats
+        grouped = final_df.groupby('Sector').agg(
+            Allocated_Budget=('Subsidy_Cost', 'sum'),
+            Revenue_Gain=('Rev_Increase', 'sum'),
+            Jobs_Created=('Jobs_Created', 'sum'),
+            MSMEs_Funded=('MSME_ID', 'count')
+        ).reset_index()
+        sector_stats = grouped.to_dict(orient='records')
+    
+        # Return a dictionary suitable for JSON serialization
+        response = {
+            "summary": {
+                "Total_Budget_Initial": budget,
+                "Total_Budget_Spent": budget - current_budget,
+                "Total_Budget_Remaining": current_budget,
+                "Total_MSMEs_Funded": len(selected),
+                "Total_Projected_Jobs_Created": int(final_df['Jobs_Created'].sum()),
+                "Total_Projected_Revenue_Gain": int(final_df['Rev_Increase'].sum())
+            },
+            "allocations": _layout(output_df, layout),
+            "rejected": _layout(rejected_df, layout),
+            "sector_stats": sector_stats
+        }
+        if rejected_summary is not None:
+            response["rejected_summary"] = rejected_summary
+            response["rejected_page"] = {"offset": rejected_offset, "limit": rejected_limit or 0, "total": rejected_total}
+    if solver_info is not None:
+        response["solver"] = solver_info
+    return response
+
+def _layout(df, layout):
+    if layout == 'columns':
+        return {col: df[col].to_numpy().tolist() for col in df.columns}
+    return df.to_dict(orient='records')
+
+def _empty_layout(columns, layout):
+    return {col: [] for col in columns} if layout == 'columns' else []
+
+def _empty_summary(budget):
     return {
-        "summary": {
-            "Total_Budget_Initial": budget,
-            "Total_Budget_Spent": budget - current_budget,
-            "Total_Budget_Remaining": current_budget,
-            "Total_MSMEs_Funded": len(selected_allocations),
-            "Total_Projected_Jobs_Created": int(final_df['Jobs_Created'].sum()) if not final_df.empty else 0,
-            "Total_Projected_Revenue_Gain": int(final_df['Rev_Increase'].sum()) if not final_df.empty else 0
-        },
-        "allocations": output_df.to_dict(orient="records"),
-        "rejected": rejected_allocations,
-        "sector_stats": sector_stats
+        "Total_Budget_Initial": budget,
+        "Total_Budget_Spent": 0,
+        "Total_Budget_Remaining": budget,
+        "Total_MSMEs_Funded": 0,
+        "Total_Projected_Jobs_Created": 0,
+        "Total_Projected_Revenue_Gain": 0
     }
-    return output
 
-def generate_tradeoff_curve(budget: float):
-    """
-    Runs the optimization engine across 6 distinct w_rev vs w_emp scenarios
-    (0.0 to 1.0) to generate the structural points for the Trade-off Curve UI.
-    """
+def selection_summary(candidates, selected, budget, remaining):
+    """run_optimization's summary block for a greedy selection (positions in selection order)."""
+    # Totals are summed in selection order so they round exactly like run_optimization
+    return {
+        "Total_Budget_Initial": budget,
+        "Total_Budget_Spent": budget - remaining,
+        "Total_Budget_Remaining": remaining,
+        "Total_MSMEs_Funded": len(selected),
+        "Total_Projected_Jobs_Created": int(candidates['Jobs_Created'][selected].sum()),
+        "Total_Projected_Revenue_Gain": int(candidates['Rev_Increase'][selected].sum())
+    }
+
+def _frontier_points(candidates, order, budgets):
+    cost = candidates['Subsidy_Cost']
+    
+    msme_seq = candidates['msme_rows'][order]
+    _, first = np.unique(msme_seq, return_index=True)
+    first_pos = np.sort(first)
+    cum_cost = np.cumsum(cost[order[first_pos]])
+    
+    # Prefix sums only reproduce the sequential `budget -= cost` exactly for whole amounts
+    max_cost = cost.max()
+    exact_prefix = bool(np.all(cost == np.floor(cost)))
+    
     points = []
-    for i in range(6):
-        w_rev = round(i * 0.2, 1)
-        w_emp = round(1.0 - w_rev, 1)
+    for budget in budgets:
+        if exact_prefix and budget >= max_cost:
+            stop = int(np.searchsorted(cum_cost, budget, side='right'))
+            spent_prefix = cum_cost[stop - 1] if stop > 0 else 0
+            funded_at = np.full(candidates['n_msmes'], len(order))
+            funded_at[msme_seq[first_pos[:stop]]] = first_pos[:stop]
+            start = first_pos[stop] if stop < len(first_pos) else len(order)
+            tail, _, remaining = greedy_select(candidates, order, budget - spent_prefix, start, funded_at)
+            selected = np.concatenate((order[first_pos[:stop]], tail))
+        else:
+            selected, _, remaining = greedy_select(candidates, order, budget)
         
-        # Calculate for this specific weight
-        res = run_optimization(budget, w_rev, w_emp)
-        summary = res.get("summary", {})
+        points.append(selection_summary(candidates, selected, budget, remaining))
+    
+    return points
+
+def budget_frontier(budgets, w_rev, w_emp):
+    """
+    Greedy summary totals for many budgets from a single ranked candidate pass.
+    
+    The ranked sequence is reduced once to the first pair of every MSME with prefix
+    sums of their costs. While the budget covers every subsidy amount, the greedy
+    pass funds exactly a prefix of that sequence, found by binary search; only the
+    tail after the first pair that no longer fits is scanned with greedy_select.
+    Budgets below the largest subsidy fall back to a full pass.
+    """
+    candidates = get_candidates()
+    budgets = [float(b) for b in budgets]
+    if len(candidates['msme_rows']) == 0:
+        return [_empty_summary(b) for b in budgets]
+    
+    _, order = get_ranking(candidates, w_rev, w_emp)
+    return _frontier_points(candidates, order, budgets)
+
+# Candidate set handed to tradeoff sweep worker processes once, via the pool initializer
+_sweep_candidates = None
+
+def _init_sweep_worker(candidates):
+    global _sweep_candidates
+    _sweep_candidates = candidates
+
+def _sweep_weight(task):
+    w_rev, w_emp, budgets = task
+    candidates = _sweep_candidates
+    _, score_per_cost = score_candidates(candidates, w_rev, w_emp)
+    return _frontier_points(candidates, rank_candidates(score_per_cost), budgets)
+
+def mark_pareto_optimal(points):
+    """Flag points not dominated on (revenue_gain, jobs_created) by another point."""
+    rev = np.array([p["revenue_gain"] for p in points])
+    jobs = np.array([p["jobs_created"] for p in points])
+    dominated = ((rev[None, :] >= rev[:, None]) & (jobs[None, :] >= jobs[:, None]) &
+                 ((rev[None, :] > rev[:, None]) | (jobs[None, :] > jobs[:, None]))).any(axis=1)
+    for p, d in zip(points, dominated):
+        p["pareto_optimal"] = not bool(d)
+    return points
+
+def generate_tradeoff_curve(budget: float, points: int = 6, budgets=None, workers=None):
+    """
+    Sweeps `points` evenly spaced w_rev vs w_emp scenarios (0.0 to 1.0) to generate the
+    Trade-off Curve UI, optionally for every budget in `budgets` (a budget x weight grid).
+    
+    Candidates are built once; each weight only re-ranks them and answers all budgets
+    from that one ranking. Large sweeps are spread over a process pool (`workers`
+    processes, chosen automatically when None). Points are flagged Pareto-optimal
+    per budget.
+    """
+    candidates = get_candidates()
+    budget_list = [float(b) for b in budgets] if budgets else [float(budget)]
+    weights = [0.0] if points < 2 else [round(i / (points - 1), 4) for i in range(points)]
+    tasks = [(w_rev, round(1.0 - w_rev, 4), budget_list) for w_rev in weights]
+    
+    if len(candidates['msme_rows']) == 0:
+        results = [[_empty_summary(b) for b in budget_list] for _ in tasks]
+    else:
+        if workers is None:
+            work = len(candidates['msme_rows']) * len(tasks)
+            workers = min(os.cpu_count() or 1, len(tasks)) if work >= SWEEP_PARALLEL_MIN_WORK else 1
         
-        points.append({
-            "w_rev": w_rev,
-            "w_emp": w_emp,
-            "revenue_gain": summary.get("Total_Projected_Revenue_Gain", 0),
-            "jobs_created": summary.get("Total_Projected_Jobs_Created", 0),
-            "msmes_funded": summary.get("Total_MSMEs_Funded", 0)
-        })
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                     initargs=(candidates,)) as pool:
+                results = list(pool.map(_sweep_weight, tasks))
+        else:
+            _init_sweep_worker(candidates)
+            results = [_sweep_weight(task) for task in tasks]
+    
+    curve = []
+    for b, budget_value in enumerate(budget_list):
+        row = []
+        for (w_rev, w_emp, _), summaries in zip(tasks, results):
+            summary = summaries[b]
+            point = {
+                "w_rev": w_rev,
+                "w_emp": w_emp,
+                "revenue_gain": summary["Total_Projected_Revenue_Gain"],
+                "jobs_created": summary["Total_Projected_Jobs_Created"],
+                "msmes_funded": summary["Total_MSMEs_Funded"]
+            }
+            if budgets:
+                point["budget"] = budget_value
+            row.append(point)
+        curve.extend(mark_pareto_optimal(row))
         
-    return points
+    return curve
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run Phase 4: Budget-Constrained Scheme Optimization.")
@@ -178,6 +478,9 @@ if __name__ == "__main__":
     parser.add_argument('--w_rev', type=float, default=0.5, help="Weight importance setting for Revenue (0 to 1)")
     parser.add_argument('--w_emp', type=float, default=0.5, help="Weight importance setting for Employment (0 to 1)")
     parser.add_argument('--tradeoff', action='store_true', help="Generate tradeoff curve points instead of single optimization run")
+    parser.add_argument('--points', type=int, default=6, help="Number of weight points in the tradeoff sweep")
+    parser.add_argument('--solver', choices=knapsack_solver.SOLVERS, default='greedy', help="Allocation solver: greedy heuristic, rounded LP relaxation or exact knapsack")
+    parser.add_argument('--time_limit', type=float, default=knapsack_solver.DEFAULT_TIME_LIMIT, help="Wall-clock limit in seconds for the exact solver")
     
     args = parser.parse_args()
     
@@ -185,4 +488,11 @@ if __name__ == "__main__":
     if args.w_rev + args.w_emp > 1.01 or args.w_rev + args.w_emp < 0.99:
         print("Warning: Policy weights usually sum to 1. Proceeding anyway...")
         
-    run_optimization(args.budget, args.w_rev, args.w_emp)
+    if args.tradeoff:
+        for point in generate_tradeoff_curve(args.budget, args.points):
+            print(point)
+    else:
+        result = run_optimization(args.budget, args.w_rev, args.w_emp, args.solver, args.time_limit)
+        print(result["summary"])
+        if "solver" in result:
+            print(result["solver"])
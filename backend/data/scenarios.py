@@ -0,0 +1,406 @@
+"""
+What-if scenarios answered from the cached candidate set.
+
+A request is a base configuration (budget, w_rev, w_emp) plus scenarios, each with
+optional budget/weight overrides and a list of deltas:
+
+    {"type": "drop_scheme", "scheme": "SCH_03"}
+    {"type": "set_subsidy", "scheme": "SCH_03", "amount": 4000000}
+    {"type": "set_impact", "scheme": "Tech Upgradation", "revenue_pct": 12, "jobs": 4}
+    {"type": "exclude_sector", "sector": "Retail"}
+
+Schemes are referenced by Scheme_ID or Scheme_Name. A delta only masks candidate
+pairs or rewrites the columns of the pairs it touches; the base ranking is kept and
+only those pairs are re-placed in it (a full re-rank happens when the change moves
+the score normalization, or the weights differ). The greedy pass is then resumed
+from the first position where the scenario's ranking or budget decisions part
+from the baseline's, so its prefix is never walked again.
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from data.optimization_engine import (
+    get_candidate_snapshot, get_ranking, score_candidates, rank_candidates, greedy_select, selection_summary,
+)
+
+DELTA_TYPES = ('drop_scheme', 'set_subsidy', 'set_impact', 'exclude_sector')
+# Threads evaluating the scenarios of one request (NumPy releases the GIL in the heavy parts)
+SCENARIO_WORKERS = int(os.environ.get('MSME_SCENARIO_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+def _scheme_row(scheme_df, ref):
+    matches = np.flatnonzero((scheme_df['Scheme_ID'].astype(str) == str(ref)).to_numpy() |
+                             (scheme_df['Scheme_Name'].astype(str) == str(ref)).to_numpy())
+    if len(matches) == 0:
+        raise ValueError(f"Unknown scheme '{ref}'")
+    return matches[0]
+
+
+def _sector_mask(msme_df, sector):
+    """Boolean mask over MSMEs in `sector` (matched case-insensitively)."""
+    codes, uniques = pd.factorize(msme_df['Sector'])
+    target = str(sector).strip().lower()
+    hit = np.array([str(u).strip().lower() == target for u in uniques] + [False])
+    if not hit.any():
+        raise ValueError(f"Unknown sector '{sector}'")
+    return hit[codes]
+
+
+def _number(delta, field, required=True):
+    value = delta.get(field)
+    if value is None:
+        if required:
+            raise ValueError(f"{delta.get('type')} needs '{field}'")
+        return None
+    value = float(value)
+    if not np.isfinite(value) or value < 0:
+        raise ValueError(f"'{field}' must be a non-negative number")
+    return value
+
+
+def apply_deltas(candidates, msme_df, scheme_df, deltas):
+    """
+    Apply `deltas` to the candidate arrays. Returns (scenario, keep, affected):
+    `scenario` shares every column no delta touched with `candidates`, `keep` masks
+    the pairs still eligible and `affected` the pairs whose cost or impact changed.
+    """
+    scenario = dict(candidates)
+    keep = np.ones(len(candidates['msme_rows']), dtype=bool)
+    affected = np.zeros(len(keep), dtype=bool)
+
+    def writable(column):
+        if scenario[column] is candidates[column]:
+            scenario[column] = candidates[column].astype(float)
+        return scenario[column]
+
+    for delta in deltas:
+        kind = delta.get('type')
+        if kind not in DELTA_TYPES:
+            raise ValueError(f"Unknown delta type '{kind}', expected one of {', '.join(DELTA_TYPES)}")
+        if kind == 'exclude_sector':
+            keep &= ~_sector_mask(msme_df, delta.get('sector'))[candidates['msme_rows']]
+            continue
+
+        rows = candidates['scheme_rows'] == _scheme_row(scheme_df, delta.get('scheme'))
+        if kind == 'drop_scheme':
+            keep &= ~rows
+        elif kind == 'set_subsidy':
+            writable('Subsidy_Cost')[rows] = _number(delta, 'amount')
+            affected |= rows
+        else:
+            revenue_pct = _number(delta, 'revenue_pct', required=False)
+            jobs = _number(delta, 'jobs', required=False)
+            if revenue_pct is None and jobs is None:
+                raise ValueError("set_impact needs 'revenue_pct' and/or 'jobs'")
+            if revenue_pct is not None:
+                # Same arithmetic as build_candidates
+                rev_increase = candidates['Before_Revenue'][rows] * (revenue_pct / 100)
+                writable('Rev_Increase')[rows] = rev_increase
+                writable('After_Revenue')[rows] = candidates['Before_Revenue'][rows] + rev_increase
+            if jobs is not None:
+                writable('Jobs_Created')[rows] = jobs
+            affected |= rows
+
+    return scenario, keep, affected & keep
+
+
+def _max_or_one(values):
+    return (values.max() if len(values) else 0) or 1
+
+
+def scenario_ranking(baseline, scenario, keep, affected, w_rev, w_emp):
+    """
+    (order, method) for the kept pairs. With the baseline's weights and normalization
+    maxima, unaffected pairs keep their scores and relative order, so only the affected
+    pairs are re-scored and merged in. Otherwise the kept pairs are ranked from
+    scratch. Either way the order is the one rank_candidates gives the edited data.
+    """
+    candidates = baseline['candidates']
+    same_weights = (w_rev, w_emp) == (baseline['w_rev'], baseline['w_emp'])
+    if keep.all() and not affected.any():
+        if same_weights or len(keep) == 0:
+            return baseline['order'], 'baseline'
+        return get_ranking(candidates, w_rev, w_emp)[1], 'cached'
+
+    kept = np.flatnonzero(keep)
+    if len(kept) == 0:
+        return kept, 'full'
+    same_scale = (_max_or_one(scenario['Rev_Increase'][kept]) == _max_or_one(candidates['Rev_Increase']) and
+                  _max_or_one(scenario['Jobs_Created'][kept]) == _max_or_one(candidates['Jobs_Created']))
+    if not (same_weights and same_scale):
+        _, score_per_cost = score_candidates({col: scenario[col][kept] for col in
+                                              ('Rev_Increase', 'Jobs_Created', 'Subsidy_Cost')}, w_rev, w_emp)
+        return kept[rank_candidates(score_per_cost)], 'full'
+
+    base_order = baseline['order']
+    rest = base_order[keep[base_order] & ~affected[base_order]]
+    moved = np.flatnonzero(affected)
+    moved_per_cost = _rescore(scenario, moved, baseline, w_rev, w_emp)
+    ranked = rank_candidates(moved_per_cost)
+    moved, moved_per_cost = moved[ranked], moved_per_cost[ranked]
+    at = _merge_positions(baseline['score_per_cost'][rest], rest, moved_per_cost, moved, len(keep))
+    return np.insert(rest, at, moved), 'incremental'
+
+
+def _merge_positions(rest_per_cost, rest, moved_per_cost, moved, n_candidates):
+    """
+    Where to insert `moved` into `rest` so the result stays in rank_candidates order
+    (descending Score_per_Cost, ties by candidate position); both are in that order.
+    """
+    neg_rest = -rest_per_cost
+    at = np.searchsorted(neg_rest, -moved_per_cost, side='left')
+    tied = np.flatnonzero(np.searchsorted(neg_rest, -moved_per_cost, side='right') > at)
+    if len(tied):
+        # Key every rest pair by (start of its run of equal scores, candidate position);
+        # the keys increase along `rest`, so a tied pair's slot is one more search
+        is_start = np.concatenate(([True], neg_rest[1:] != neg_rest[:-1]))
+        run_start = np.flatnonzero(is_start)[np.cumsum(is_start) - 1]
+        rest_key = run_start.astype(np.int64) * n_candidates + rest
+        at[tied] = np.searchsorted(rest_key, at[tied].astype(np.int64) * n_candidates + moved[tied])
+    return at
+
+
+def _rescore(scenario, rows, baseline, w_rev, w_emp):
+    """Score_per_Cost of `rows` under the baseline's normalization maxima."""
+    norm_rev = scenario['Rev_Increase'][rows] / baseline['max_rev']
+    norm_emp = scenario['Jobs_Created'][rows] / baseline['max_emp']
+    cost = scenario['Subsidy_Cost'][rows]
+    return ((norm_rev * w_rev) + (norm_emp * w_emp)) / np.where(cost == 0, 1, cost)
+
+
+def _budget_divergence(baseline, budget, limit):
+    """
+    First position before `limit` where the baseline's greedy pass, run with `budget`
+    instead of its own, would decide differently; `limit` when none does.
+    """
+    if budget == baseline['budget'] or limit == 0:
+        return limit
+    candidates, order = baseline['candidates'], baseline['order']
+    positions = np.arange(limit)
+    msme_seq = candidates['msme_rows'][order[:limit]]
+    cost_seq = candidates['Subsidy_Cost'][order[:limit]]
+    selected_pos = baseline['selected_pos']
+
+    # Pairs whose MSME is still unfunded when the pass reaches them
+    open_pairs = baseline['funded_at'][msme_seq] >= positions
+    funded_before = np.searchsorted(selected_pos, positions)
+    selected_cost = candidates['Subsidy_Cost'][order[selected_pos]]
+    old_remaining = np.subtract.accumulate(np.concatenate(([baseline['budget']], selected_cost)))[funded_before]
+    new_remaining = np.subtract.accumulate(np.concatenate(([budget], selected_cost)))[funded_before]
+    differs = np.flatnonzero(open_pairs & ((cost_seq <= old_remaining) != (cost_seq <= new_remaining)))
+    return int(differs[0]) if len(differs) else limit
+
+
+def build_baseline(candidates, budget, w_rev, w_emp):
+    """The base configuration's ranking and greedy pass over `candidates`, shared by every scenario."""
+    if len(candidates['msme_rows']):
+        score, order = get_ranking(candidates, w_rev, w_emp)
+    else:
+        score, order = np.array([]), np.array([], dtype=np.int64)
+    selected, _, remaining = greedy_select(candidates, order, budget)
+
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    selected_pos = rank[selected]
+    funded_at = np.full(candidates['n_msmes'], len(order))
+    funded_at[candidates['msme_rows'][selected]] = selected_pos
+    cost = candidates['Subsidy_Cost']
+    return {
+        'candidates': candidates,
+        'budget': budget,
+        'w_rev': w_rev,
+        'w_emp': w_emp,
+        'order': order,
+        'score_per_cost': score / np.where(cost == 0, 1, cost),
+        'max_rev': _max_or_one(candidates['Rev_Increase']),
+        'max_emp': _max_or_one(candidates['Jobs_Created']),
+        'selected': selected,
+        'selected_pos': selected_pos,
+        'funded_at': funded_at,
+        'remaining': remaining,
+    }
+
+
+def run_scenario(baseline, msme_df, scheme_df, budget, w_rev, w_emp, deltas):
+    """Greedy selection for one scenario: (scenario arrays, selected, remaining, replay info)."""
+    candidates = baseline['candidates']
+    scenario, keep, affected = apply_deltas(candidates, msme_df, scheme_df, deltas)
+    order, method = scenario_ranking(baseline, scenario, keep, affected, w_rev, w_emp)
+
+    # Longest prefix walked identically: same pairs, untouched costs, same budget decisions
+    base_order = baseline['order']
+    common = min(len(order), len(base_order))
+    mismatch = np.flatnonzero(order[:common] != base_order[:common])
+    start = int(mismatch[0]) if len(mismatch) else common
+    touched = np.flatnonzero(affected[order[:start]])
+    if len(touched):
+        start = int(touched[0])
+    start = _budget_divergence(baseline, budget, start)
+
+    prefix_pos = baseline['selected_pos'][baseline['selected_pos'] < start]
+    prefix = base_order[prefix_pos]
+    funded_at = np.full(candidates['n_msmes'], len(order))
+    funded_at[candidates['msme_rows'][prefix]] = prefix_pos
+    remaining = np.subtract.accumulate(np.concatenate(([budget], candidates['Subsidy_Cost'][prefix])))[-1].item()
+    tail, _, remaining = greedy_select(scenario, order, remaining, start, funded_at)
+
+    replay = {'ranking': method, 'recomputed_candidates': int(affected.sum()),
+              'excluded_candidates': int((~keep).sum()), 'start': start, 'positions': len(order)}
+    return scenario, np.concatenate((prefix, tail)).astype(np.int64), remaining, replay
+
+
+def _allocation_diff(baseline, scenario, selected, msme_df, scheme_df):
+    """Allocations added, removed or moved to another scheme, per MSME, as column arrays."""
+    candidates = baseline['candidates']
+    n_msmes = candidates['n_msmes']
+    base_pick = np.full(n_msmes, -1)
+    base_pick[candidates['msme_rows'][baseline['selected']]] = baseline['selected']
+    new_pick = np.full(n_msmes, -1)
+    new_pick[candidates['msme_rows'][selected]] = selected
+
+    msme_ids = msme_df['MSME_ID'].to_numpy()
+    sectors = np.asarray(msme_df['Sector'], dtype=object)
+    scheme_names = scheme_df['Scheme_Name'].to_numpy()
+
+    def rows(msmes, picks, arrays):
+        return {
+            'MSME_ID': msme_ids[msmes].tolist(),
+            'Sector': sectors[msmes].tolist(),
+            'Scheme_Name': scheme_names[candidates['scheme_rows'][picks]].tolist(),
+            'Subsidy_Cost': arrays['Subsidy_Cost'][picks].tolist(),
+        }
+
+    added = np.flatnonzero((base_pick < 0) & (new_pick >= 0))
+    removed = np.flatnonzero((base_pick >= 0) & (new_pick < 0))
+    moved = np.flatnonzero((base_pick >= 0) & (new_pick >= 0) &
+                           (candidates['scheme_rows'][base_pick] != candidates['scheme_rows'][new_pick]))
+    return {
+        'added': rows(added, new_pick[added], scenario),
+        'removed': rows(removed, base_pick[removed], candidates),
+        'changed': {
+            'MSME_ID': msme_ids[moved].tolist(),
+            'Sector': sectors[moved].tolist(),
+            'From_Scheme': scheme_names[candidates['scheme_rows'][base_pick[moved]]].tolist(),
+            'To_Scheme': scheme_names[candidates['scheme_rows'][new_pick[moved]]].tolist(),
+        },
+        'counts': {'added': len(added), 'removed': len(removed), 'changed': len(moved)},
+    }
+
+
+def evaluate_scenarios(base, scenarios, workers=None):
+    """
+    Evaluate `scenarios` against the `base` configuration (dicts as described in the
+    module docstring) on a thread pool of `workers` (SCENARIO_WORKERS by default).
+    Returns the baseline summary plus, per scenario, its summary, the change in each
+    total, the allocation diff against the baseline and how much was replayed.
+    """
+    budget, w_rev, w_emp = float(base['budget']), base['w_rev'], base['w_emp']
+    msme_df, scheme_df, candidates = get_candidate_snapshot()
+    baseline = build_baseline(candidates, budget, w_rev, w_emp)
+    base_summary = selection_summary(baseline['candidates'], baseline['selected'], budget, baseline['remaining'])
+
+    def evaluate(indexed):
+        i, spec = indexed
+        s_budget = float(spec['budget']) if spec.get('budget') is not None else budget
+        s_w_rev = spec['w_rev'] if spec.get('w_rev') is not None else w_rev
+        s_w_emp = spec['w_emp'] if spec.get('w_emp') is not None else w_emp
+        scenario, selected, remaining, replay = run_scenario(
+            baseline, msme_df, scheme_df, s_budget, s_w_rev, s_w_emp, spec.get('deltas') or [])
+        summary = selection_summary(scenario, selected, s_budget, remaining)
+        return {
+            'name': spec.get('name') or f"scenario_{i + 1}",
+            'budget': s_budget,
+            'w_rev': s_w_rev,
+            'w_emp': s_w_emp,
+            'summary': summary,
+            'change': {key: summary[key] - base_summary[key] for key in summary},
+            'diff': _allocation_diff(baseline, scenario, selected, msme_df, scheme_df),
+            'replay': replay,
+        }
+
+    workers = min(workers or SCENARIO_WORKERS, len(scenarios))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='msme-scenario') as pool:
+            results = list(pool.map(evaluate, enumerate(scenarios)))
+    else:
+        results = [evaluate(item) for item in enumerate(scenarios)]
+
+    return {
+        'baseline': {'budget': budget, 'w_rev': w_rev, 'w_emp': w_emp, 'summary': base_summary},
+        'scenarios': results,
+    }
+
+
+def _reference_selection(scenario, keep, budget, w_rev, w_emp):
+    """From-scratch rank and greedy pass over the kept pairs of the edited arrays."""
+    kept = np.flatnonzero(keep)
+    if len(kept) == 0:
+        return kept, budget
+    subset = {col: scenario[col][kept] for col in ('msme_rows', 'Subsidy_Cost', 'Rev_Increase', 'Jobs_Created')}
+    subset['n_msmes'] = scenario['n_msmes']
+    _, score_per_cost = score_candidates(subset, w_rev, w_emp)
+    selected, _, remaining = greedy_select(subset, rank_candidates(score_per_cost), budget)
+    return kept[selected], remaining
+
+
+def parity_check(trials=100, seed=0):
+    """
+    Run random scenarios through run_scenario and through a from-scratch rank and
+    greedy pass on the same edited arrays. Weights of 0 and 1 are drawn often since
+    they score many pairs equally. Returns the scenarios whose selections differ.
+    """
+    rng = np.random.default_rng(seed)
+    msme_df, scheme_df, candidates = get_candidate_snapshot()
+    if len(candidates['msme_rows']) == 0:
+        return []
+    schemes = scheme_df['Scheme_ID'].astype(str).tolist()
+    caps = scheme_df['Max_Subsidy_Amount'].dropna().unique()
+    sectors = [str(sector) for sector in pd.unique(msme_df['Sector'].dropna())]
+    cheapest = pd.Series(candidates['Subsidy_Cost']).groupby(candidates['msme_rows']).min().sum()
+
+    def random_weights():
+        w_rev = float(rng.choice([0.0, 1.0, 0.5, round(rng.random(), 2)]))
+        return w_rev, round(1.0 - w_rev, 4)
+
+    def random_delta():
+        kind = DELTA_TYPES[rng.choice(len(DELTA_TYPES), p=[0.3, 0.3, 0.3, 0.1])]
+        if kind == 'exclude_sector':
+            return {'type': kind, 'sector': sectors[rng.integers(len(sectors))]}
+        delta = {'type': kind, 'scheme': schemes[rng.integers(len(schemes))]}
+        if kind == 'set_subsidy':
+            delta['amount'] = float(rng.choice(caps))
+        elif kind == 'set_impact':
+            delta.update(revenue_pct=int(rng.integers(0, 30)), jobs=int(rng.integers(0, 15)))
+        return delta
+
+    mismatches = []
+    for trial in range(trials):
+        budget = float(rng.uniform(0.05, 0.8) * cheapest)
+        w_rev, w_emp = random_weights()
+        baseline = build_baseline(candidates, budget, w_rev, w_emp)
+        s_budget = float(rng.uniform(0.05, 0.8) * cheapest) if rng.random() < 0.3 else budget
+        s_w_rev, s_w_emp = random_weights() if rng.random() < 0.2 else (w_rev, w_emp)
+        deltas = [random_delta() for _ in range(rng.integers(0, 4))]
+
+        scenario, selected, remaining, replay = run_scenario(
+            baseline, msme_df, scheme_df, s_budget, s_w_rev, s_w_emp, deltas)
+        _, keep, _ = apply_deltas(candidates, msme_df, scheme_df, deltas)
+        expected, expected_remaining = _reference_selection(scenario, keep, s_budget, s_w_rev, s_w_emp)
+        if not np.array_equal(selected, expected) or remaining != expected_remaining:
+            mismatches.append({'trial': trial, 'budget': s_budget, 'w_rev': s_w_rev, 'w_emp': s_w_emp,
+                               'deltas': deltas, 'replay': replay})
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check incremental scenarios against from-scratch optimization.")
+    parser.add_argument('--check', type=int, default=100, help="Number of random scenarios to compare")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the random scenarios")
+    args = parser.parse_args()
+
+    mismatches = parity_check(args.check, args.seed)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f"{args.check - len(mismatches)}/{args.check} scenarios match the from-scratch optimization")
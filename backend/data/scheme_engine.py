@@ -1,36 +1,29 @@
+import numpy as np
 import pandas as pd
-import os
+import threading
+from services.data_loader import load_msme_data, load_scheme_data, get_data_version, get_indexed_table
+from services.eligibility import ELIGIBILITY_RULES, get_scheme_index, eligible_mask, eligible_pairs
+from services.instrumentation import stage
 
-def load_data():
-    project_data_path = os.path.join(os.path.dirname(__file__), 'MSME_PROJECT_DATA.xlsx')
-    scheme_data_path = os.path.join(os.path.dirname(__file__), 'SCHEME_DATASET_FINAL.xlsx')
-    
-    msme_df = pd.read_excel(project_data_path)
-    scheme_df = pd.read_excel(scheme_data_path)
-    return msme_df, scheme_df
+MAX_RECOMMENDATIONS = 5
 
-def check_eligibility(msme, scheme):
-    # Sector check (substring match for cases where scheme allows multiple e.g. "Manufacturing, IT")
-    sector_match = 'all' in str(scheme['Eligible_Sectors']).lower() or str(msme['Sector']).lower() in str(scheme['Eligible_Sectors']).lower()
-    
-    # Category check (Target_Category in Scheme maps to Enterprise_Size in MSME: Micro/Small/Medium)
-    cat_match = 'all' in str(scheme['Target_Category']).lower() or str(msme['Enterprise_Size']).lower() in str(scheme['Target_Category']).lower()
-    
-    # Location check
-    loc_match = 'all' in str(scheme['Location_Criteria']).lower() or 'urban/rural' in str(scheme['Location_Criteria']).lower() or str(msme['Location_Type']).lower() in str(scheme['Location_Criteria']).lower()
-    
-    return sector_match and cat_match and loc_match
+# Materialized top-N recommendations for the MSME table, keyed by (msme, schemes) version
+_recommendation_cache = {'version': None, 'table': None}
+_recommendation_lock = threading.Lock()
+
+def load_data():
+    return load_msme_data(), load_scheme_data()
 
 def run_simulation():
     msme_df, scheme_df = load_data()
     
     results = []
     
-    for _, msme in msme_df.iterrows():
-        eligible_schemes = []
-        for _, scheme in scheme_df.iterrows():
-            if check_eligibility(msme, scheme):
-                eligible_schemes.append(scheme)
+    msme_rows, scheme_rows = eligible_pairs(get_scheme_index(), msme_df)
+    bounds = msme_rows.searchsorted(range(len(msme_df) + 1))
+    
+    for i, (_, msme) in enumerate(msme_df.iterrows()):
+        eligible_schemes = [scheme_df.iloc[j] for j in scheme_rows[bounds[i]:bounds[i + 1]]]
                 
         if eligible_schemes:
             # Pick the scheme with the highest revenue impact if multiple are eligible
@@ -66,27 +59,19 @@ def get_msme_schemes(msme_dict):
     eligible_schemes = []
     before_rev = msme_dict.get('Annual_Revenue', 0)
     
-    for _, scheme in scheme_df.iterrows():
-        # Sector check
-        sector_match = 'all' in str(scheme['Eligible_Sectors']).lower() or str(msme_dict.get('Sector', '')).lower() in str(scheme['Eligible_Sectors']).lower()
-        
-        # Category check
-        cat_match = 'all' in str(scheme['Target_Category']).lower() or str(msme_dict.get('Enterprise_Size', '')).lower() in str(scheme['Target_Category']).lower()
-        
-        # Location check
-        loc_type = str(msme_dict.get('Location_Type', '')).lower()
-        loc_criteria = str(scheme['Location_Criteria']).lower()
-        loc_match = 'all' in loc_criteria or 'urban/rural' in loc_criteria or loc_type in loc_criteria
-        
-        if sector_match and cat_match and loc_match:
+    with stage('schemes.eligibility'):
+        mask = eligible_mask(get_scheme_index(), msme_dict)
+    
+    with stage('schemes.simulate'):
+        for _, scheme in scheme_df[mask].iterrows():
             impact_percent = scheme['Impact_Factor_Revenue (%)']
             if pd.isna(impact_percent): impact_percent = 0
-            
+        
             jobs = scheme['Impact_Factor_Employment (Jobs)']
             if pd.isna(jobs): jobs = 0
-            
+        
             after_rev = before_rev + (before_rev * (impact_percent / 100))
-            
+        
             eligible_schemes.append({
                 "Scheme_Name": scheme['Scheme_Name'],
                 "Impact_Factor_Revenue_Percent": float(impact_percent),
@@ -96,14 +81,95 @@ def get_msme_schemes(msme_dict):
                 "Revenue_Gain": float(after_rev - before_rev),
                 "Subsidy_Cap": float(scheme['Max_Subsidy_Amount'])
             })
-            
-    # Sort eligible schemes by Revenue Gain descending, limit to 5
-    eligible_schemes = sorted(eligible_schemes, key=lambda x: x.get('Revenue_Gain', 0), reverse=True)[:5]
+        
+        # Sort eligible schemes by Revenue Gain descending, limit to 5
+        eligible_schemes = sorted(eligible_schemes, key=lambda x: x.get('Revenue_Gain', 0), reverse=True)[:5]
     
     if len(eligible_schemes) > 0:
         eligible_schemes[0]['Recommended'] = True
         
     return eligible_schemes
 
+def build_recommendations(msme_df, scheme_df, index):
+    """
+    Top MAX_RECOMMENDATIONS schemes for every MSME in one vectorized pass, ranked like
+    get_msme_schemes (Revenue_Gain descending, ties in scheme order). Returns columnar
+    arrays of the kept (MSME, scheme) pairs plus `bounds`, so MSME row i owns pairs
+    bounds[i]:bounds[i + 1].
+    """
+    msme_rows, scheme_rows = eligible_pairs(index, msme_df)
+    
+    impact = scheme_df['Impact_Factor_Revenue (%)'].fillna(0).to_numpy(dtype=float)[scheme_rows]
+    jobs = scheme_df['Impact_Factor_Employment (Jobs)'].fillna(0).to_numpy(dtype=float)[scheme_rows]
+    before = msme_df['Annual_Revenue'].fillna(0).to_numpy(dtype=float)[msme_rows]
+    after = before + (before * (impact / 100))
+    gain = after - before
+    
+    # Rank inside each MSME and keep the first N
+    order = np.lexsort((-gain, msme_rows))
+    starts = np.searchsorted(msme_rows[order], msme_rows[order], side='left')
+    keep = order[np.arange(len(order)) - starts < MAX_RECOMMENDATIONS]
+    
+    return {
+        'bounds': np.searchsorted(msme_rows[keep], np.arange(len(msme_df) + 1)),
+        'scheme_name': scheme_df['Scheme_Name'].to_numpy()[scheme_rows[keep]],
+        'subsidy_cap': scheme_df['Max_Subsidy_Amount'].to_numpy(dtype=float)[scheme_rows[keep]],
+        'impact': impact[keep],
+        'jobs': jobs[keep].astype(np.int64),
+        'before': before[keep],
+        'after': after[keep],
+        'gain': gain[keep],
+    }
+
+def recommendations_for_row(table, row):
+    """The get_msme_schemes-shaped list for MSME row `row` of a recommendation table."""
+    start, stop = table['bounds'][row], table['bounds'][row + 1]
+    schemes = [
+        {
+            "Scheme_Name": table['scheme_name'][k],
+            "Impact_Factor_Revenue_Percent": float(table['impact'][k]),
+            "Impact_Factor_Employment": int(table['jobs'][k]),
+            "Before_Revenue": float(table['before'][k]),
+            "Projected_After_Revenue": float(table['after'][k]),
+            "Revenue_Gain": float(table['gain'][k]),
+            "Subsidy_Cap": float(table['subsidy_cap'][k]),
+        }
+        for k in range(start, stop)
+    ]
+    if schemes:
+        schemes[0]['Recommended'] = True
+    return schemes
+
+def get_recommendation_table():
+    """Recommendations for every MSME, rebuilt only when the MSME or scheme data changes."""
+    version = (get_data_version('msme'), get_data_version('schemes'))
+    with _recommendation_lock:
+        if _recommendation_cache['table'] is None or _recommendation_cache['version'] != version:
+            msme_df, scheme_df = load_data()
+            with stage('schemes.build_recommendations'):
+                _recommendation_cache['table'] = build_recommendations(msme_df, scheme_df, get_scheme_index())
+            _recommendation_cache['version'] = version
+        return _recommendation_cache['table']
+
+def get_schemes_by_ids(msme_ids):
+    """Returns ({msme_id: recommended schemes}, [ids not in the MSME table])."""
+    table = get_recommendation_table()
+    _, index = get_indexed_table('msme')
+    results = {msme_id: recommendations_for_row(table, index[msme_id]) for msme_id in msme_ids if msme_id in index}
+    return results, [msme_id for msme_id in msme_ids if msme_id not in index]
+
+def get_schemes_for_records(records):
+    """Recommendations for ad-hoc MSME records (dicts), one list per record."""
+    msme_df = pd.DataFrame.from_records(records)
+    for _, msme_col, _ in ELIGIBILITY_RULES.values():
+        if msme_col not in msme_df.columns:
+            msme_df[msme_col] = None
+    if 'Annual_Revenue' not in msme_df.columns:
+        msme_df['Annual_Revenue'] = 0
+    msme_df['Annual_Revenue'] = pd.to_numeric(msme_df['Annual_Revenue'], errors='coerce')
+    
+    table = build_recommendations(msme_df, load_scheme_data(), get_scheme_index())
+    return [recommendations_for_row(table, row) for row in range(len(msme_df))]
+
 if __name__ == "__main__":
     run_simulation()
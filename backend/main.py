@@ -1,13 +1,64 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import json
-from model.train import train_model, MODEL_DIR
-from model.predict import get_predictions, get_prediction_by_id
-from data.optimization_engine import run_optimization, generate_tradeoff_curve
-from data.scheme_engine import get_msme_schemes
+import base64
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from pydantic import BaseModel
+from model.train import train_model
+from model.artifacts import METRICS_FILE, artifact_path
+from model.predict import get_prediction_by_id, predict_records, query_predictions, iter_prediction_chunks
+from model.rescore import rescore_changed
+from model.explain import build_explanations, explain_msmes, get_top_drivers, TOP_DRIVERS
+from data.optimization_engine import run_optimization, generate_tradeoff_curve, budget_frontier
+from data.scenarios import evaluate_scenarios
+from data.knapsack_solver import SOLVERS, DEFAULT_TIME_LIMIT
+from data.scheme_engine import get_msme_schemes, get_schemes_by_ids, get_schemes_for_records
+from services.result_cache import cached_response, invalidate, cache_stats
+from services.data_loader import get_data_version, load_msme_data, load_predicted_data, load_scheme_data
+from services.shared_store import SHARED_ENABLED
+from model.forest import load_forest
+from services.executor import run_blocking
+from services.instrumentation import MetricsMiddleware, render_prometheus
+from services.compression import CompressionMiddleware
+from services.jobs import submit_job, get_job, get_job_result
 
-app = FastAPI()
+MAX_FRONTIER_POINTS = 1000
+MAX_TRADEOFF_POINTS = 1001
+MAX_SOLVER_TIME_LIMIT = 60.0
+MAX_PREDICT_ROWS = 100_000
+MAX_EXPLAIN_IDS = 10_000
+MAX_PAGE_SIZE = 1000
+# /optimize response encodings (see services.response_formats)
+OPTIMIZE_FORMATS = ("json", "columns", "arrow")
+MAX_SCHEME_BATCH = 10_000
+MAX_SCENARIOS = 64
+MAX_SCENARIO_DELTAS = 100
+
+# Inputs whose version stamp keys cached optimization results
+OPTIMIZATION_SOURCES = ('msme', 'schemes', 'predictions')
+
+
+def warm_up():
+    """Attach the tables and forest before serving, so a new worker's first request is not a cold load."""
+    load_msme_data()
+    load_predicted_data()
+    load_scheme_data()
+    load_forest()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if SHARED_ENABLED:
+        await run_blocking(warm_up)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,68 +66,390 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-Payload-Bytes", "Server-Timing"],
 )
+app.add_middleware(CompressionMiddleware)
+# Outermost, so response sizes are recorded as sent (after compression)
+app.add_middleware(MetricsMiddleware)
+
+def load_metrics(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _training_job(progress, search=False, n_jobs=None):
+    metrics = train_model(progress, search=search, n_jobs=n_jobs)
+    invalidate()
+    # Per-MSME explanations need shap; without it /msme/{id} just omits top_drivers
+    try:
+        build_explanations(lambda stage, fraction: progress(stage, 0.95 + 0.05 * fraction))
+    except ImportError:
+        pass
+    return metrics
+
+@app.post("/train", status_code=202)
+async def train(search: bool = False, n_jobs: Optional[int] = None):
+    if n_jobs is not None and n_jobs < 1:
+        raise HTTPException(status_code=400, detail="n_jobs must be at least 1")
+    job = submit_job("train", lambda progress: _training_job(progress, search, n_jobs))
+    return dict(job, status_url=f"/train/jobs/{job['id']}", result_url=f"/train/jobs/{job['id']}/result")
+
+def _rescore_job(progress):
+    summary = rescore_changed(progress)
+    if summary['written']:
+        # Only results built on the MSME or predictions tables are affected
+        summary['cache_entries_dropped'] = invalidate(('msme', 'predictions'))
+    return summary
 
-@app.get("/train")
-async def train():
+@app.post("/predictions/rescore", status_code=202)
+async def rescore():
+    job = submit_job("rescore", _rescore_job)
+    return dict(job, status_url=f"/train/jobs/{job['id']}", result_url=f"/train/jobs/{job['id']}/result")
+
+@app.get("/train/jobs/{job_id}")
+async def train_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/train/jobs/{job_id}/result")
+async def train_result(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return get_job_result(job_id)
+
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    # Resolved per request: each training run publishes its metrics with its model
+    metrics_path = artifact_path(METRICS_FILE)
+    if not os.path.exists(metrics_path):
+        raise HTTPException(status_code=404, detail="Metrics not found. Please train model first.")
     try:
-        metrics = train_model()
-        return metrics
+        return await run_blocking(cached_response, request, "metrics", {}, lambda: load_metrics(metrics_path),
+                                  (metrics_path,))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/metrics")
-async def get_metrics():
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return cache_stats()
+
+@app.get("/debug/metrics", response_class=PlainTextResponse)
+async def debug_metrics():
+    stats = cache_stats()
+    gauges = {f"msme_result_cache_{name}": value for name, value in stats.items()}
+    return PlainTextResponse(render_prometheus(gauges), media_type="text/plain; version=0.0.4")
+
+def _parse_predict_body(body, content_type):
+    """Accept one record, a list of records, {"records": [...]} or NDJSON (one record per line)."""
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = payload.get("records", [payload])
+    return payload
+
+@app.post("/predict")
+async def predict(request: Request):
     try:
-        metrics_path = os.path.join(MODEL_DIR, 'metrics.json')
-        if os.path.exists(metrics_path):
-            with open(metrics_path, 'r') as f:
-                return json.load(f)
-        raise HTTPException(status_code=404, detail="Metrics not found. Please train model first.")
+        records = _parse_predict_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON record, a list of records or NDJSON")
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise HTTPException(status_code=400, detail="Each record must be a JSON object")
+    if not records:
+        raise HTTPException(status_code=400, detail="No records to score")
+    if len(records) > MAX_PREDICT_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PREDICT_ROWS} records per request")
+    
+    try:
+        started = time.perf_counter()
+        predictions = await run_blocking(predict_records, records)
+        return {
+            "count": len(predictions),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+            "predictions": predictions,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _encode_cursor(offset, version):
+    raw = json.dumps({"o": offset, "v": version}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor, version):
+    """Offset stored in a cursor; cursors from an older predictions version are rejected."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(data["o"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("v") != version:
+        raise HTTPException(status_code=410, detail="Cursor expired: predictions changed since it was issued")
+    return offset
+
+def _ndjson_lines(df, positions):
+    for rows in iter_prediction_chunks(df, positions):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+
 @app.get("/msmes")
-async def msmes():
+async def msmes(
+    request: Request,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    sector: Optional[str] = None,
+    location: Optional[str] = None,
+    size: Optional[str] = None,
+    category: Optional[str] = None,
+    q: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    sort: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None,
+):
+    """
+    Predictions table with optional filters, sort and `fields=` projection. Without
+    `limit` every matching row is returned (as before); with it, a page plus an
+    X-Next-Cursor header. format=ndjson (or Accept: application/x-ndjson) streams rows.
+    """
+    if limit is not None and (limit < 1 or limit > MAX_PAGE_SIZE):
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must be non-negative")
+    stream = format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", "")
+    filters = {"sector": sector, "location": location, "size": size, "category": category}
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    
     try:
-        predictions = get_predictions()
-        return predictions
+        version = (get_data_version("predictions") or "")[:16]
+        if cursor:
+            offset = _decode_cursor(cursor, version)
+        df, positions = await run_blocking(query_predictions, filters, q, min_score, max_score, sort, field_list)
+        total = len(positions)
+        page = positions[offset:offset + limit] if limit is not None else positions[offset:]
+        headers = {"X-Total-Count": str(total)}
+        if limit is not None and offset + limit < total:
+            headers["X-Next-Cursor"] = _encode_cursor(offset + limit, version)
+        
+        if df is None:
+            return JSONResponse(content=[], headers=headers)
+        if stream:
+            return StreamingResponse(_ndjson_lines(df, page), media_type="application/x-ndjson", headers=headers)
+        rows = await run_blocking(lambda: [row for chunk in iter_prediction_chunks(df, page) for row in chunk])
+        return JSONResponse(content=jsonable_encoder(rows), headers=headers)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/msme/{id}")
 async def msme(id: str):
     try:
-        prediction = get_prediction_by_id(id)
+        prediction = await run_blocking(get_prediction_by_id, id)
         if prediction:
+            prediction["top_drivers"] = await run_blocking(get_top_drivers, id)
             return prediction
         raise HTTPException(status_code=404, detail="MSME not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class ExplanationRequest(BaseModel):
+    ids: List[str]
+    top_n: int = TOP_DRIVERS
+
+@app.post("/explanations")
+async def explanations(body: ExplanationRequest):
+    if len(body.ids) > MAX_EXPLAIN_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_EXPLAIN_IDS} MSMEs per request")
+    if body.top_n < 1:
+        raise HTTPException(status_code=400, detail="top_n must be at least 1")
+    try:
+        result = await run_blocking(explain_msmes, body.ids, body.top_n)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Explanations not available. Please train model first.")
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/msme/{id}/schemes")
 async def msme_schemes(id: str):
     try:
-        prediction = get_prediction_by_id(id)
+        results, _ = await run_blocking(get_schemes_by_ids, [id])
+        if id in results:
+            return results[id]
+        # Scored MSMEs missing from the source table still get a live evaluation
+        prediction = await run_blocking(get_prediction_by_id, id)
         if prediction and "original_data" in prediction:
-            schemes = get_msme_schemes(prediction["original_data"])
+            schemes = await run_blocking(get_msme_schemes, prediction["original_data"])
             return schemes
         raise HTTPException(status_code=404, detail="MSME not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class SchemeBatchRequest(BaseModel):
+    ids: List[str] = []
+    records: List[dict] = []
+
+@app.post("/schemes/batch")
+async def schemes_batch(body: SchemeBatchRequest):
+    if len(body.ids) + len(body.records) > MAX_SCHEME_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_SCHEME_BATCH} MSMEs per request")
+    try:
+        results, missing = await run_blocking(get_schemes_by_ids, body.ids)
+        records = await run_blocking(get_schemes_for_records, body.records) if body.records else []
+        return {"results": results, "missing": missing, "records": records}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/optimize/tradeoff")
-async def optimize_tradeoff(budget: float = 100000000):
+async def optimize_tradeoff(request: Request, budget: float = 100000000, points: int = 6, budgets: Optional[str] = None):
+    if points < 1 or points > MAX_TRADEOFF_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must be between 1 and {MAX_TRADEOFF_POINTS}")
+    budget_list = None
+    if budgets:
+        try:
+            budget_list = [float(b) for b in budgets.split(",") if b.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="budgets must be a comma-separated list of numbers")
+        if len(budget_list) * points > MAX_FRONTIER_POINTS * 10:
+            raise HTTPException(status_code=400, detail="Budget x weight grid is too large")
+    
     try:
-        points = generate_tradeoff_curve(budget)
-        return points
+        params = {"budget": budget, "points": points, "budgets": budget_list}
+        return await run_blocking(cached_response, request, "tradeoff", params,
+                                  lambda: generate_tradeoff_curve(budget, points, budget_list),
+                                  OPTIMIZATION_SOURCES)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/optimize")
-async def optimize(budget: float = 100000000, w_rev: float = 0.5, w_emp: float = 0.5):
+async def optimize(request: Request, budget: float = 100000000, w_rev: float = 0.5, w_emp: float = 0.5,
+                   solver: str = "greedy", time_limit: float = DEFAULT_TIME_LIMIT, format: str = "json",
+                   rejections: Optional[str] = None, rejected_offset: int = 0, rejected_limit: int = 0):
+    if solver not in SOLVERS:
+        raise HTTPException(status_code=400, detail=f"solver must be one of {', '.join(SOLVERS)}")
+    if time_limit <= 0 or time_limit > MAX_SOLVER_TIME_LIMIT:
+        raise HTTPException(status_code=400, detail=f"time_limit must be in (0, {MAX_SOLVER_TIME_LIMIT}] seconds")
+    if format not in OPTIMIZE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(OPTIMIZE_FORMATS)}")
+    # Compact formats aggregate rejections unless the full list is asked for
+    rejections = rejections or ("full" if format == "json" else "summary")
+    if rejections not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="rejections must be full or summary")
+    if rejected_offset < 0 or not 0 <= rejected_limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"rejected_offset must be >= 0 and rejected_limit between 0 and {MAX_PAGE_SIZE}")
+    try:
+        params = {"budget": budget, "w_rev": w_rev, "w_emp": w_emp, "solver": solver, "time_limit": time_limit,
+                  "rejections": rejections, "rejected_offset": rejected_offset, "rejected_limit": rejected_limit}
+        layout = "rows" if format == "json" else "columns"
+        return await run_blocking(cached_response, request, "optimize", params,
+                                  lambda: run_optimization(budget, w_rev, w_emp, solver, time_limit, layout,
+                                                           rejections, rejected_offset, rejected_limit),
+                                  OPTIMIZATION_SOURCES, format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/optimize/frontier")
+async def optimize_frontier(
+    request: Request,
+    budgets: Optional[str] = None,
+    budget_min: Optional[float] = None,
+    budget_max: Optional[float] = None,
+    budget_step: Optional[float] = None,
+    w_rev: float = 0.5,
+    w_emp: float = 0.5,
+):
+    if budgets:
+        try:
+            budget_list = [float(b) for b in budgets.split(",") if b.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="budgets must be a comma-separated list of numbers")
+    elif budget_min is not None and budget_max is not None and budget_step:
+        if budget_step <= 0 or budget_max < budget_min:
+            raise HTTPException(status_code=400, detail="Expected budget_min <= budget_max and budget_step > 0")
+        count = int((budget_max - budget_min) // budget_step) + 1
+        budget_list = [budget_min + i * budget_step for i in range(min(count, MAX_FRONTIER_POINTS + 1))]
+    else:
+        raise HTTPException(status_code=400, detail="Provide budgets=... or budget_min, budget_max and budget_step")
+    
+    if len(budget_list) > MAX_FRONTIER_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FRONTIER_POINTS} budgets per request")
+    
+    try:
+        params = {"budgets": budget_list, "w_rev": w_rev, "w_emp": w_emp}
+        return await run_blocking(cached_response, request, "frontier", params,
+                                  lambda: {"w_rev": w_rev, "w_emp": w_emp, "points": budget_frontier(budget_list, w_rev, w_emp)},
+                                  OPTIMIZATION_SOURCES)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class ScenarioDelta(BaseModel):
+    type: str
+    scheme: Optional[str] = None
+    sector: Optional[str] = None
+    amount: Optional[float] = None
+    revenue_pct: Optional[float] = None
+    jobs: Optional[float] = None
+
+class Scenario(BaseModel):
+    name: Optional[str] = None
+    budget: Optional[float] = None
+    w_rev: Optional[float] = None
+    w_emp: Optional[float] = None
+    deltas: List[ScenarioDelta] = []
+
+class ScenarioRequest(BaseModel):
+    budget: float = 100000000
+    w_rev: float = 0.5
+    w_emp: float = 0.5
+    scenarios: List[Scenario]
+
+@app.post("/optimize/scenarios")
+async def optimize_scenarios(request: Request, body: ScenarioRequest):
+    if not 1 <= len(body.scenarios) <= MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {MAX_SCENARIOS} scenarios")
+    if any(len(scenario.deltas) > MAX_SCENARIO_DELTAS for scenario in body.scenarios):
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCENARIO_DELTAS} deltas per scenario")
+    
     try:
-        results = run_optimization(budget, w_rev, w_emp)
-        return results
+        params = body.model_dump(exclude_none=True)
+        base = {"budget": body.budget, "w_rev": body.w_rev, "w_emp": body.w_emp}
+        scenarios = [scenario.model_dump(exclude_none=True) for scenario in body.scenarios]
+        return await run_blocking(cached_response, request, "scenarios", params,
+                                  lambda: evaluate_scenarios(base, scenarios),
+                                  OPTIMIZATION_SOURCES, "columns")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,73 @@
+"""
+Versioned model artifacts.
+
+Each training run writes its model, encoder, forest and metrics into a fresh
+directory under versions/ and publishes the whole set by atomically replacing the
+CURRENT pointer, so a reader that resolves the directory once never pairs files
+from two runs. The SHAP store computed after a run is added to that run's
+directory. Trees trained before versioning keep their files in MODEL_DIR, which
+is served until the first versioned run is published.
+"""
+import os
+import shutil
+import time
+
+MODEL_DIR = os.environ.get('MSME_MODEL_DIR', os.path.dirname(__file__))
+VERSIONS_DIR = os.path.join(MODEL_DIR, 'versions')
+CURRENT_PATH = os.path.join(MODEL_DIR, 'CURRENT')
+
+MODEL_FILE = 'model.pkl'
+ENCODER_FILE = 'encoder.pkl'
+FOREST_FILE = 'forest.npz'
+METRICS_FILE = 'metrics.json'
+SEARCH_METRICS_FILE = 'search_metrics.json'
+SHAP_VALUES_FILE = 'shap_values.npy'
+SHAP_META_FILE = 'shap_meta.json'
+
+# Published versions kept on disk: the served one plus the one before it, which a
+# reader that resolved it just before a publish may still be loading
+KEEP_VERSIONS = 2
+
+
+def current_dir():
+    """Directory of the served artifact set."""
+    try:
+        with open(CURRENT_PATH) as f:
+            name = f.read().strip()
+    except OSError:
+        return MODEL_DIR
+    path = os.path.join(VERSIONS_DIR, name)
+    return path if name and os.path.isdir(path) else MODEL_DIR
+
+
+def artifact_path(name, directory=None):
+    return os.path.join(directory or current_dir(), name)
+
+
+def version_name(directory):
+    """Published version an artifact directory holds (None for the files in MODEL_DIR)."""
+    return None if directory == MODEL_DIR else os.path.basename(directory)
+
+
+def new_version_dir():
+    """An empty, unpublished version directory for a training run to write into."""
+    path = os.path.join(VERSIONS_DIR, f"v{time.time_ns()}-{os.getpid()}")
+    os.makedirs(path)
+    return path
+
+
+def discard_version(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def publish_version(directory):
+    """Serve the artifacts in `directory` from now on, then prune old versions."""
+    name = os.path.basename(directory)
+    with open(CURRENT_PATH + '.tmp', 'w') as f:
+        f.write(name)
+    os.replace(CURRENT_PATH + '.tmp', CURRENT_PATH)
+
+    # Names sort by creation time; newer ones belong to runs still in progress
+    older = sorted(v for v in os.listdir(VERSIONS_DIR) if v <= name)
+    for stale in older[:-KEEP_VERSIONS]:
+        discard_version(os.path.join(VERSIONS_DIR, stale))
@@ -0,0 +1,42 @@
+"""
+Score a CSV, Parquet or XLSX file of MSMEs with the served model, chunk by chunk.
+
+    python -m model.batch_score new_msmes.csv scored.parquet
+    python -m model.batch_score new_msmes.parquet scored.parquet --xlsx scored.xlsx
+
+Memory stays bounded by --chunk-rows regardless of the input size: each chunk is
+read, encoded, scored and appended to the output before the next one is read.
+"""
+import argparse
+import os
+from services import ingest
+from services.data_loader import CATEGORICAL_COLUMNS
+from model.predict import get_predictor, score_frames
+
+
+def score_file(input_path, output_path, chunk_rows=ingest.CHUNK_ROWS, xlsx_path=None):
+    """Score `input_path` into a Parquet file (and optionally a workbook copy); returns the row count."""
+    model, pipeline = get_predictor()
+    chunks = ingest.iter_chunks(input_path, chunk_rows, categorical=CATEGORICAL_COLUMNS)
+    tmp_path = output_path + '.tmp.parquet'
+    try:
+        rows = ingest.write_parquet(score_frames(model, pipeline, chunks), tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if xlsx_path:
+        ingest.write_xlsx(ingest.iter_chunks(output_path, chunk_rows), xlsx_path)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score an MSME file chunk by chunk")
+    parser.add_argument("input", help="CSV, Parquet or XLSX file with the training columns")
+    parser.add_argument("output", help="Parquet file to write")
+    parser.add_argument("--chunk-rows", type=int, default=ingest.CHUNK_ROWS)
+    parser.add_argument("--xlsx", help="Also write the scored rows to this workbook")
+    args = parser.parse_args()
+
+    rows = score_file(args.input, args.output, args.chunk_rows, args.xlsx)
+    print(f"Scored {rows} rows -> {args.output}")
@@ -0,0 +1,246 @@
+import os
+import json
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from services.data_loader import get_indexed_table, get_data_version
+from services.preprocessing import encode_records
+from model.predict import get_predictor
+from model.artifacts import SHAP_VALUES_FILE, SHAP_META_FILE, artifact_path, current_dir, version_name
+
+SHAP_CHUNK_ROWS = 2000
+# Rows copied at a time when carrying a store over to new predictions
+SHAP_COPY_ROWS = 50_000
+TOP_DRIVERS = 5
+
+# Served store: memory-mapped contribution matrix plus its metadata, keyed by file stamp
+_store = {'stamp': None, 'values': None, 'meta': None}
+_store_lock = threading.Lock()
+
+# Per-process explainer for the chunk workers
+_worker_explainer = None
+
+
+def _growth_contributions(shap_values):
+    """
+    Per-feature contributions to Growth_Score from per-class SHAP values. Growth_Score
+    is linear in the class probabilities, so its contributions are the same
+    combination of the High and Moderate class contributions.
+    """
+    if isinstance(shap_values, list):
+        shap_values = np.stack(shap_values, axis=-1)
+    return ((shap_values[:, :, 2] + 0.5 * shap_values[:, :, 1]) * 100).astype(np.float32)
+
+
+def _init_shap_worker(model):
+    global _worker_explainer
+    import shap
+    _worker_explainer = shap.TreeExplainer(model)
+
+
+def _shap_chunk(X):
+    return _growth_contributions(_worker_explainer.shap_values(X, check_additivity=False))
+
+
+def compute_shap_values(model, X, out, workers=None, progress=None):
+    """
+    TreeSHAP Growth_Score contributions for every row of `X`, computed in chunks of
+    SHAP_CHUNK_ROWS across worker processes and written into `out` (rows x features).
+    """
+    report = progress or (lambda stage, fraction: None)
+    chunks = [(start, min(start + SHAP_CHUNK_ROWS, len(X))) for start in range(0, len(X), SHAP_CHUNK_ROWS)]
+    workers = workers or min(len(chunks), os.cpu_count() or 1)
+
+    if workers <= 1:
+        _init_shap_worker(model)
+        results = (_shap_chunk(X[start:stop]) for start, stop in chunks)
+        for done, ((start, stop), values) in enumerate(zip(chunks, results), 1):
+            out[start:stop] = values
+            report('explaining', done / len(chunks))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_shap_worker, initargs=(model,)) as pool:
+        results = pool.map(_shap_chunk, [X[start:stop] for start, stop in chunks])
+        for done, ((start, stop), values) in enumerate(zip(chunks, results), 1):
+            out[start:stop] = values
+            report('explaining', done / len(chunks))
+
+
+def _require_shap():
+    """Raise ImportError up front, before a store is staged, when shap is missing."""
+    import shap  # noqa: F401
+
+
+def _discard_staged(path):
+    # No-op once the staged matrix was published (moved into place)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _expected_growth_score(model):
+    import shap
+    expected = np.atleast_1d(shap.TreeExplainer(model).expected_value)
+    return float((expected[2] + 0.5 * expected[1]) * 100)
+
+
+def build_explanations(progress=None, workers=None):
+    """
+    Precompute Growth_Score SHAP contributions for every served MSME and swap them in
+    as a float32 .npy matrix (row i = row i of the predictions table). Run after
+    train_model; the store is written into the served model's artifact directory,
+    and its metadata pins the model and predictions versions the rows refer to.
+    """
+    report = progress or (lambda stage, fraction: None)
+    directory = current_dir()
+    model, pipeline = get_predictor(directory)
+    df, _ = get_indexed_table('predictions')
+    if df is None:
+        raise RuntimeError("Predictions not found. Please train model first.")
+
+    _require_shap()
+    X = encode_records(pipeline, df)
+    staged_values = artifact_path(SHAP_VALUES_FILE, directory) + '.tmp.npy'
+    try:
+        out = np.lib.format.open_memmap(staged_values, mode='w+', dtype=np.float32, shape=X.shape)
+        compute_shap_values(model, X, out, workers=workers, progress=progress)
+        out.flush()
+        del out
+
+        meta = {
+            'model_version': version_name(directory),
+            'predictions_version': get_data_version('predictions'),
+            'feature_names': pipeline['feature_names'],
+            'base_value': _expected_growth_score(model),
+            'rows': int(X.shape[0]),
+        }
+        report('publishing explanations', 1.0)
+        _publish_explanations(directory, staged_values, meta)
+    finally:
+        _discard_staged(staged_values)
+    return meta
+
+
+def update_explanations(previous, source_rows, progress=None, workers=None):
+    """
+    Rebuild the store for the current predictions from `previous`, the (values, meta)
+    store of the predictions they replaced, without recomputing unchanged rows: row i
+    copies previous row source_rows[i], and rows marked -1 (new or changed MSMEs) get
+    fresh TreeSHAP values. The model must be the one `previous` was computed with.
+    """
+    report = progress or (lambda stage, fraction: None)
+    old_values, old_meta = previous
+    directory = current_dir()
+    if old_meta.get('model_version') != version_name(directory):
+        raise RuntimeError("The model changed since these explanations were computed; rebuild them.")
+    model, pipeline = get_predictor(directory)
+    df, _ = get_indexed_table('predictions')
+    if df is None or len(df) != len(source_rows):
+        raise RuntimeError("Predictions changed while explanations were being updated.")
+    if old_meta['feature_names'] != pipeline['feature_names']:
+        raise RuntimeError("Explanations were computed for a different feature set; rebuild them.")
+
+    fresh = np.flatnonzero(source_rows < 0)
+    if fresh.size:
+        _require_shap()
+    staged_values = artifact_path(SHAP_VALUES_FILE, directory) + '.tmp.npy'
+    try:
+        out = np.lib.format.open_memmap(staged_values, mode='w+', dtype=np.float32,
+                                        shape=(len(df), len(pipeline['feature_names'])))
+        for start in range(0, len(df), SHAP_COPY_ROWS):
+            sources = source_rows[start:start + SHAP_COPY_ROWS]
+            kept = np.flatnonzero(sources >= 0)
+            out[start + kept] = old_values[sources[kept]]
+
+        if fresh.size:
+            fresh_values = np.empty((fresh.size, out.shape[1]), dtype=np.float32)
+            compute_shap_values(model, encode_records(pipeline, df.iloc[fresh]), fresh_values,
+                                workers=workers, progress=progress)
+            out[fresh] = fresh_values
+        out.flush()
+        del out
+
+        meta = dict(old_meta, predictions_version=get_data_version('predictions'), rows=len(df))
+        report('publishing explanations', 1.0)
+        _publish_explanations(directory, staged_values, meta)
+    finally:
+        _discard_staged(staged_values)
+    return meta
+
+
+def _publish_explanations(directory, staged_values, meta):
+    meta_path = artifact_path(SHAP_META_FILE, directory)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(staged_values, artifact_path(SHAP_VALUES_FILE, directory))
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def get_explanation_store():
+    """
+    Return (values memmap, meta) for the served model and current predictions, or
+    (None, None) when explanations are missing or were computed for a different
+    model or predictions version.
+    """
+    directory = current_dir()
+    values_path = artifact_path(SHAP_VALUES_FILE, directory)
+    meta_path = artifact_path(SHAP_META_FILE, directory)
+    if not (os.path.exists(values_path) and os.path.exists(meta_path)):
+        return None, None
+    stat = os.stat(meta_path)
+    values_stat = os.stat(values_path)
+    stamp = (directory, stat.st_mtime_ns, stat.st_size, values_stat.st_mtime_ns, values_stat.st_size)
+    with _store_lock:
+        if _store['stamp'] != stamp:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            _store.update(stamp=stamp, values=np.load(values_path, mmap_mode='r'), meta=meta)
+        values, meta = _store['values'], _store['meta']
+
+    if meta.get('model_version') != version_name(directory) or meta['predictions_version'] != get_data_version('predictions'):
+        return None, None
+    return values, meta
+
+
+def _drivers(row, feature_names, top_n):
+    top = np.argsort(-np.abs(row), kind='stable')[:top_n]
+    return [{"feature": feature_names[i], "contribution": float(row[i])} for i in top]
+
+
+def explain_msmes(msme_ids, top_n=TOP_DRIVERS):
+    """
+    Top Growth_Score drivers for each MSME plus the cohort's mean |contribution| per
+    feature. Returns None when no up-to-date explanation store exists.
+    """
+    values, meta = get_explanation_store()
+    if values is None:
+        return None
+    _, index = get_indexed_table('predictions')
+    feature_names = meta['feature_names']
+
+    found = [msme_id for msme_id in msme_ids if msme_id in index]
+    rows = np.asarray(values[[index[msme_id] for msme_id in found]]) if found else np.zeros((0, len(feature_names)), dtype=np.float32)
+
+    cohort = {}
+    if found:
+        mean_abs = np.abs(rows).mean(axis=0)
+        cohort = {feature_names[i]: float(mean_abs[i]) for i in np.argsort(-mean_abs, kind='stable')[:top_n]}
+
+    return {
+        "base_value": meta['base_value'],
+        "explanations": {msme_id: _drivers(row, feature_names, top_n) for msme_id, row in zip(found, rows)},
+        "missing": [msme_id for msme_id in msme_ids if msme_id not in index],
+        "cohort_top_drivers": cohort,
+    }
+
+
+def get_top_drivers(msme_id, top_n=TOP_DRIVERS):
+    """Top Growth_Score drivers for one MSME, or None when unavailable."""
+    result = explain_msmes([msme_id], top_n)
+    if result is None or msme_id not in result["explanations"]:
+        return None
+    return {"base_value": result["base_value"], "drivers": result["explanations"][msme_id]}
+
+
+if __name__ == "__main__":
+    meta = build_explanations(lambda stage, fraction: print(f"{stage}: {fraction:.0%}"))
+    print(f"Explained {meta['rows']} MSMEs, base Growth_Score {meta['base_value']:.2f}")
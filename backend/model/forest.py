@@ -0,0 +1,140 @@
+import os
+import json
+import threading
+import numpy as np
+from services import shared_store
+from model.artifacts import FOREST_FILE, artifact_path
+
+# Deliberately free of scikit-learn: serving only needs NumPy and the exported arrays.
+
+# Rows scored per traversal batch (bounds the rows x trees node-index matrix)
+SCORE_CHUNK_ROWS = 4096
+
+_cached_forest = None
+_cached_forest_stamp = None
+_forest_lock = threading.Lock()
+
+
+def export_forest(model, pipeline, path, X_check):
+    """
+    Flatten a fitted RandomForestClassifier into node arrays and write them with the
+    feature pipeline to `path` (.npz); leaves are the nodes whose children point at
+    themselves. Raises RuntimeError unless the exported forest reproduces
+    model.predict_proba(X_check) bit for bit, so a bad export never gets published.
+    """
+    n_classes = len(model.classes_)
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        leaf = tree.children_left < 0
+
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        totals = value.sum(axis=1)
+        if not np.allclose(totals, 1.0):
+            # Older scikit-learn stores class counts and normalizes at predict time
+            totals[totals == 0.0] = 1.0
+            value = value / totals[:, None]
+
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(leaf, 0.0, tree.threshold))
+        lefts.append(np.where(leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(leaf, node_ids, tree.children_right) + offset)
+        values.append(value)
+        roots.append(offset)
+        offset += tree.node_count
+
+    arrays = {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.int32),
+        'classes': np.asarray(model.classes_),
+        'pipeline': np.array(json.dumps(pipeline)),
+    }
+
+    expected = model.predict_proba(X_check)
+    actual = forest_predict_proba(arrays, np.asarray(X_check, dtype=np.float32))
+    if not np.array_equal(expected, actual):
+        raise RuntimeError(f"Exported forest disagrees with scikit-learn (max diff {np.abs(expected - actual).max()})")
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def forest_predict_proba(forest, X):
+    """
+    Class probabilities for float32 rows `X`. All (tree, row) pairs descend together,
+    one level per step, and pairs drop out once they reach a leaf; tree outputs are
+    then summed in estimator order exactly as scikit-learn does.
+    """
+    feature, threshold = forest['feature'], forest['threshold']
+    left, right, value, roots = forest['left'], forest['right'], forest['value'], forest['roots']
+    internal = left != np.arange(len(left))
+    n_features = X.shape[1]
+    probabilities = np.zeros((len(X), value.shape[1]))
+
+    for start in range(0, len(X), SCORE_CHUNK_ROWS):
+        chunk = X[start:start + SCORE_CHUNK_ROWS]
+        n = len(chunk)
+        flat = np.ascontiguousarray(chunk).ravel()
+        # Tree-major pairs: pair k is tree k // n, row k % n
+        node = np.repeat(roots, n)
+        row_offset = np.tile(np.arange(n, dtype=np.int64) * n_features, len(roots))
+        active = np.flatnonzero(internal[node])
+        while active.size:
+            current = node[active]
+            go_left = flat[row_offset[active] + feature[current]] <= threshold[current]
+            current = np.where(go_left, left[current], right[current])
+            node[active] = current
+            active = active[internal[current]]
+
+        leaf_values = value[node].reshape(len(roots), n, -1)
+        out = probabilities[start:start + n]
+        for t in range(len(roots)):
+            out += leaf_values[t]
+    probabilities /= len(roots)
+    return probabilities
+
+
+def load_forest(path=None):
+    """
+    The exported forest as a dict of arrays (pipeline decoded), reloaded when the file
+    changes. `path` defaults to the served artifact set's forest.
+    """
+    global _cached_forest, _cached_forest_stamp
+    path = path or artifact_path(FOREST_FILE)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    stamp = (path, stat.st_mtime_ns, stat.st_size)
+    with _forest_lock:
+        if _cached_forest is None or stamp != _cached_forest_stamp:
+            if shared_store.SHARED_ENABLED:
+                forest = _shared_forest(path, f"{stat.st_mtime_ns}-{stat.st_size}")
+            else:
+                with np.load(path) as data:
+                    forest = {key: data[key] for key in data.files}
+                forest['pipeline'] = json.loads(str(forest['pipeline']))
+            _cached_forest = forest
+            _cached_forest_stamp = stamp
+        return _cached_forest
+
+
+def _shared_forest(path, version):
+    """Forest arrays mapped from the shared snapshot for this forest.npz version."""
+    attached = shared_store.attach_arrays('forest', version)
+    if attached is None:
+        with shared_store.build_lock('forest'):
+            attached = shared_store.attach_arrays('forest', version)
+            if attached is None:
+                with np.load(path) as data:
+                    arrays = {key: data[key] for key in data.files if key != 'pipeline'}
+                    meta = {'pipeline': json.loads(str(data['pipeline']))}
+                shared_store.publish_arrays('forest', version, arrays, meta)
+                attached = shared_store.attach_arrays('forest', version)
+    arrays, meta = attached
+    return dict(arrays, pipeline=meta['pipeline'])
@@ -1,56 +1,214 @@
 import os
 import joblib
-from services.data_loader import load_predicted_data
-from services.preprocessing import preprocess_data
+import numpy as np
+import pandas as pd
+import threading
+from services.data_loader import load_predicted_data, get_indexed_table
+from model.forest import load_forest, forest_predict_proba
+from services.preprocessing import load_encoder, build_feature_pipeline, encode_records, required_columns
+from model.artifacts import MODEL_FILE, ENCODER_FILE, FOREST_FILE, current_dir
 
-MODEL_DIR = os.path.dirname(__file__)
-MODEL_PATH = os.path.join(MODEL_DIR, 'model.pkl')
+MODEL_DIR = os.environ.get('MSME_MODEL_DIR', os.path.dirname(__file__))
+
+TOP_FEATURES = 5
+# Up to this many rows the NumPy forest beats sklearn's per-tree Cython loop
+COMPILED_MAX_ROWS = 64
+
+GROWTH_LABELS = np.array(['Low', 'Moderate', 'High'], dtype=object)
 
 _cached_model = None
+_cached_model_stamp = None
+
+# Warm scoring state: the model and encoder plus the precomputed column mapping
+_predictor = {'model': None, 'encoder': None, 'pipeline': None}
+_predictor_lock = threading.Lock()
 
-def get_model():
-    global _cached_model
-    if _cached_model is None and os.path.exists(MODEL_PATH):
-        _cached_model = joblib.load(MODEL_PATH)
+def get_model(directory=None):
+    """Return the served model (from `directory`'s artifact set), reloading it once a retrain has published a new one."""
+    global _cached_model, _cached_model_stamp
+    path = os.path.join(directory or current_dir(), MODEL_FILE)
+    if not os.path.exists(path):
+        return _cached_model
+    stat = os.stat(path)
+    stamp = (path, stat.st_mtime_ns, stat.st_size)
+    if _cached_model is None or stamp != _cached_model_stamp:
+        _cached_model = joblib.load(path)
+        _cached_model_stamp = stamp
     return _cached_model
 
+def get_feature_ranking(model):
+    """
+    (feature, importance) pairs, most important first. Models trained here carry the
+    ranking in `feature_ranking_`; older pickles get it computed once and attached.
+    """
+    ranking = getattr(model, 'feature_ranking_', None)
+    if ranking is None:
+        importance = dict(zip(model.feature_names_in_, model.feature_importances_))
+        ranking = sorted(importance.items(), key=lambda item: item[1], reverse=True)
+        model.feature_ranking_ = ranking
+    return ranking
+
+def score_probabilities(probabilities):
+    """Growth_Score (0-100) and predicted category label from class probabilities."""
+    growth_score = (probabilities[:, 2] + (probabilities[:, 1] * 0.5)) * 100
+    return growth_score, GROWTH_LABELS[probabilities.argmax(axis=1)]
+
+def forest_proba(model, X):
+    """
+    RandomForest predict_proba on an already-validated float32 matrix. Same per-tree
+    accumulation as sklearn's single-job path, minus the joblib dispatch and input
+    checks that dominate small batches.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    probabilities = np.zeros((len(X), len(model.classes_)))
+    for tree in model.estimators_:
+        probabilities += tree.predict_proba(X, check_input=False)
+    probabilities /= len(model.estimators_)
+    return probabilities
+
+def get_predictor(directory=None):
+    """Return (model, pipeline), rebuilding the column mapping only when either artifact changes."""
+    # Both from one artifact set, even if a retrain publishes in between
+    directory = directory or current_dir()
+    model = get_model(directory)
+    encoder = load_encoder(os.path.join(directory, ENCODER_FILE))
+    if model is None or encoder is None:
+        raise RuntimeError("Model not trained yet. Please train model first.")
+    with _predictor_lock:
+        if _predictor['model'] is not model or _predictor['encoder'] is not encoder:
+            _predictor.update(model=model, encoder=encoder,
+                              pipeline=build_feature_pipeline(encoder, model.feature_names_in_))
+        return model, _predictor['pipeline']
+
+def predict_records(records):
+    """
+    Score raw MSME records (dicts with the training columns) with the served model.
+    Small batches use the exported forest arrays (no scikit-learn needed); larger
+    ones, or deployments without forest.npz, use the pickled model. Returns one {MSME_ID, Predicted_Growth_Category,
+    Growth_Score} dict per record.
+    """
+    directory = current_dir()
+    forest = load_forest(os.path.join(directory, FOREST_FILE))
+    if forest is not None and (len(records) <= COMPILED_MAX_ROWS or not os.path.exists(os.path.join(directory, MODEL_FILE))):
+        pipeline = forest['pipeline']
+        score = lambda X: forest_predict_proba(forest, X)
+    else:
+        model, pipeline = get_predictor(directory)
+        score = lambda X: forest_proba(model, X)
+    
+    df = pd.DataFrame.from_records(records)
+    missing = [col for col in required_columns(pipeline) if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    
+    probabilities = score(encode_records(pipeline, df))
+    growth_score, category = score_probabilities(probabilities)
+    
+    ids = df['MSME_ID'].tolist() if 'MSME_ID' in df.columns else [None] * len(df)
+    return [
+        {"MSME_ID": msme_id, "Predicted_Growth_Category": label, "Growth_Score": float(score)}
+        for msme_id, label, score in zip(ids, category, growth_score)
+    ]
+
+def score_frames(model, pipeline, chunks):
+    """
+    Score an iterable of raw MSME frames chunk by chunk, yielding each with
+    Growth_Score and Predicted_Growth_Category appended. Raises ValueError on the
+    first chunk missing a feature column.
+    """
+    columns = required_columns(pipeline)
+    for chunk in chunks:
+        missing = [col for col in columns if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        growth_score, category = score_probabilities(forest_proba(model, encode_records(pipeline, chunk)))
+        yield chunk.assign(Growth_Score=growth_score, Predicted_Growth_Category=category)
+
 def get_predictions():
     df = load_predicted_data()
     if df is not None:
         return df.to_dict(orient='records')
     return []
 
-def get_prediction_by_id(msme_id):
+# Query filters -> predictions column they match on (exact, case-insensitive)
+FILTER_COLUMNS = {
+    'sector': 'Sector',
+    'location': 'Location_Type',
+    'size': 'Category',
+    'category': 'Predicted_Growth_Category',
+}
+
+def _matches(column, value):
+    return column.astype(str).str.lower().to_numpy() == str(value).lower()
+
+def query_predictions(filters=None, search=None, min_score=None, max_score=None, sort=None, fields=None):
+    """
+    Filter, sort and project the predictions table without copying it.
+
+    `filters` maps FILTER_COLUMNS keys to values, `search` is a substring of MSME_ID
+    or Sector, and `sort` is a column name with an optional leading '-' for
+    descending. Returns (frame, row positions in output order); raises ValueError on
+    unknown columns.
+    """
     df = load_predicted_data()
-    if df is not None:
-        msme_data = df[df['MSME_ID'] == msme_id]
-        if not msme_data.empty:
-            msme_dict = msme_data.iloc[0].to_dict()
-            
-            original_data = {k: v for k, v in msme_dict.items() if k not in ['Predicted_Growth_Category', 'Growth_Score']}
-            predicted_category = msme_dict.get('Predicted_Growth_Category')
-            growth_score = msme_dict.get('Growth_Score')
-            
-            top_features = {}
-            model = get_model()
-            if model:
-                feature_importances = model.feature_importances_
-                
-                dummy_df = load_predicted_data().head(1)
-                processed_dummy = preprocess_data(dummy_df, training=False)
-                
-                try:
-                    features = processed_dummy.drop(['Growth_Category', 'Predicted_Growth_Category', 'Growth_Score'], axis=1, errors='ignore').columns
-                    if len(features) == len(feature_importances):
-                        imp_dict = dict(zip(features, feature_importances))
-                        top_features = dict(sorted(imp_dict.items(), key=lambda item: item[1], reverse=True)[:5])
-                except Exception as e:
-                    pass
-
-            return {
-                "original_data": original_data,
-                "predicted_category": predicted_category,
-                "growth_score": growth_score,
-                "top_important_features": top_features
-            }
-    return None
+    if df is None:
+        return None, np.array([], dtype=np.int64)
+    
+    mask = np.ones(len(df), dtype=bool)
+    for key, value in (filters or {}).items():
+        if value is not None:
+            mask &= _matches(df[FILTER_COLUMNS[key]], value)
+    if search:
+        term = search.lower()
+        mask &= (df['MSME_ID'].astype(str).str.lower().str.contains(term, regex=False).to_numpy()
+                 | df['Sector'].astype(str).str.lower().str.contains(term, regex=False).to_numpy())
+    if min_score is not None:
+        mask &= df['Growth_Score'].to_numpy() >= min_score
+    if max_score is not None:
+        mask &= df['Growth_Score'].to_numpy() <= max_score
+    positions = np.flatnonzero(mask)
+    
+    if sort:
+        column = sort.lstrip('-')
+        if column not in df.columns:
+            raise ValueError(f"Unknown sort column: {column}")
+        keys = df[column].iloc[positions].reset_index(drop=True)
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            keys = keys.astype(str)
+        order = keys.sort_values(ascending=not sort.startswith('-'), kind='stable').index.to_numpy()
+        positions = positions[order]
+    
+    if fields:
+        unknown = [f for f in fields if f not in df.columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        df = df[fields]
+    return df, positions
+
+def iter_prediction_chunks(df, positions, chunk_rows=1000):
+    """Yield lists of row dicts for `positions` a chunk at a time, so exports stay in constant memory."""
+    for start in range(0, len(positions), chunk_rows):
+        yield df.iloc[positions[start:start + chunk_rows]].to_dict(orient='records')
+
+def get_prediction_by_id(msme_id):
+    df, index = get_indexed_table('predictions')
+    position = index.get(msme_id)
+    if position is None:
+        return None
+    msme_dict = df.iloc[position].to_dict()
+    
+    original_data = {k: v for k, v in msme_dict.items() if k not in ['Predicted_Growth_Category', 'Growth_Score']}
+    predicted_category = msme_dict.get('Predicted_Growth_Category')
+    growth_score = msme_dict.get('Growth_Score')
+    
+    top_features = {}
+    model = get_model()
+    if model:
+        top_features = {name: float(value) for name, value in get_feature_ranking(model)[:TOP_FEATURES]}
+
+    return {
+        "original_data": original_data,
+        "predicted_category": predicted_category,
+        "growth_score": growth_score,
+        "top_important_features": top_features
+    }
@@ -0,0 +1,120 @@
+"""
+Incremental re-scoring: refresh the predictions for new or edited MSMEs with the
+served model, without retraining or re-predicting the rest of the portfolio.
+
+    python -m model.rescore
+"""
+import numpy as np
+import pandas as pd
+from services.data_loader import (
+    load_msme_data, get_indexed_table, stage_predicted_data, publish_predicted_data, KEY_COLUMN,
+)
+from services.ingest import CHUNK_ROWS
+from services.instrumentation import stage
+from model.predict import get_predictor, score_frames
+from model import explain
+
+
+def row_hashes(df, columns):
+    """64-bit content hash per row over `columns` (categoricals hash like their values)."""
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+def diff_rows(msme_df, predictions_df, predictions_index):
+    """
+    For each MSME row, the predictions row holding its current score, or -1 when the
+    MSME is new or any of its columns changed since the predictions were written.
+    Also returns the MSME_IDs that no longer exist.
+    """
+    columns = list(msme_df.columns)
+    missing = [col for col in columns if col not in predictions_df.columns]
+    if missing:
+        # The MSME table gained columns: every row counts as changed
+        return np.full(len(msme_df), -1, dtype=np.int64), []
+
+    ids = msme_df[KEY_COLUMN].tolist()
+    source_rows = np.array([predictions_index.get(msme_id, -1) for msme_id in ids], dtype=np.int64)
+    matched = np.flatnonzero(source_rows >= 0)
+    new_hashes = row_hashes(msme_df, columns)
+    old_hashes = row_hashes(predictions_df, columns)
+    changed = new_hashes[matched] != old_hashes[source_rows[matched]]
+    source_rows[matched[changed]] = -1
+
+    current = set(ids)
+    removed = [msme_id for msme_id in predictions_index if msme_id not in current]
+    return source_rows, removed
+
+
+def _merged_chunks(msme_df, scores, labels, chunk_rows):
+    for start in range(0, len(msme_df), chunk_rows):
+        stop = start + chunk_rows
+        yield msme_df.iloc[start:stop].assign(Growth_Score=scores[start:stop], Predicted_Growth_Category=labels[start:stop])
+
+
+def rescore_changed(progress=None, chunk_rows=CHUNK_ROWS):
+    """
+    Score only the MSMEs that are new or changed since the predictions were last
+    written, merge them into the predictions table and carry the explanation store
+    over. Returns a summary; nothing is rewritten when no row changed.
+    """
+    report = progress or (lambda stage, fraction: None)
+
+    report('detecting changes', 0.05)
+    msme_df = load_msme_data()
+    predictions_df, predictions_index = get_indexed_table('predictions')
+    if msme_df is None or predictions_df is None:
+        raise RuntimeError("Predictions not found. Please train model first.")
+    model, pipeline = get_predictor()
+
+    with stage('rescore.diff'):
+        source_rows, removed = diff_rows(msme_df, predictions_df, predictions_index)
+    stale = np.flatnonzero(source_rows < 0)
+    new = sum(1 for msme_id in msme_df[KEY_COLUMN].iloc[stale] if msme_id not in predictions_index)
+    summary = {
+        'rows': len(msme_df),
+        'rescored': int(stale.size),
+        'new': new,
+        'changed': int(stale.size) - new,
+        'removed': len(removed),
+        'unchanged': len(msme_df) - int(stale.size),
+        'explanations': None,
+    }
+    if stale.size == 0 and not removed and len(predictions_df) == len(msme_df):
+        return dict(summary, written=False)
+
+    # Carry unchanged scores over, then fill in the rescored rows
+    kept = np.flatnonzero(source_rows >= 0)
+    scores = np.empty(len(msme_df))
+    labels = np.empty(len(msme_df), dtype=object)
+    scores[kept] = predictions_df['Growth_Score'].to_numpy()[source_rows[kept]]
+    labels[kept] = np.asarray(predictions_df['Predicted_Growth_Category'], dtype=object)[source_rows[kept]]
+    if stale.size:
+        report('scoring changed rows', 0.2)
+        with stage('rescore.score'):
+            fresh = next(score_frames(model, pipeline, [msme_df.iloc[stale]]))
+        scores[stale] = fresh['Growth_Score'].to_numpy()
+        labels[stale] = np.asarray(fresh['Predicted_Growth_Category'], dtype=object)
+
+    # Capture the explanation store while it still matches the predictions being replaced
+    previous_explanations = explain.get_explanation_store()
+
+    report('writing predictions', 0.5)
+    with stage('rescore.write_predictions'):
+        staged = stage_predicted_data(_merged_chunks(msme_df, scores, labels, chunk_rows))
+        publish_predicted_data(staged)
+
+    if previous_explanations[0] is not None:
+        report('updating explanations', 0.7)
+        try:
+            with stage('rescore.explanations'):
+                explain.update_explanations(previous_explanations, source_rows,
+                                            lambda stage, fraction: report(stage, 0.7 + 0.3 * fraction))
+            summary['explanations'] = 'updated'
+        except (ImportError, RuntimeError):
+            # Without shap (or after a feature change) the old store goes stale and is ignored
+            summary['explanations'] = 'stale'
+    return dict(summary, written=True)
+
+
+if __name__ == "__main__":
+    print(rescore_changed(lambda stage, fraction: print(f"{stage}: {fraction:.0%}")))
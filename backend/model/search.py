@@ -0,0 +1,227 @@
+"""
+Cross-validated hyperparameter search for the growth model.
+
+Each (fold, parameter set) is one work unit that grows its forest with warm_start
+through the n_estimators ladder, scoring the fold after every step and stopping
+early once more trees stop paying off. Units run across a process pool that maps
+the feature matrix from a temporary file, and each finished unit is cached by data
+version and parameters, so a re-run only fits what is new. The cache is pruned
+after every search to SEARCH_CACHE_MAX_ENTRIES units, dropping the least recently
+used first and anything unused for SEARCH_CACHE_MAX_AGE seconds.
+"""
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+MODEL_DIR = os.environ.get('MSME_MODEL_DIR', os.path.dirname(__file__))
+SEARCH_CACHE_DIR = os.path.join(MODEL_DIR, '.search_cache')
+SEARCH_CACHE_MAX_ENTRIES = 5000
+SEARCH_CACHE_MAX_AGE = 30 * 24 * 3600
+
+# n_estimators is the warm-start ladder; every other key is crossed into parameter sets
+PARAM_GRID = {
+    'n_estimators': [100, 200, 400],
+    'max_depth': [None, 8, 16],
+    'min_samples_leaf': [1, 5],
+    'max_features': ['sqrt', 0.5],
+}
+SEARCH_FOLDS = 5
+SEARCH_SEED = 42
+# Stop growing a forest once adding trees improves fold accuracy by less than this
+MIN_GAIN = 0.002
+
+# Feature matrix and labels mapped by each worker process
+_worker_data = {}
+
+
+def _unit_key(data_version, params, ladder, fold):
+    raw = json.dumps([data_version, params, ladder, fold, SEARCH_FOLDS, SEARCH_SEED, MIN_GAIN], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _read_cached(key):
+    path = os.path.join(SEARCH_CACHE_DIR, key + '.json')
+    try:
+        with open(path) as f:
+            result = json.load(f)
+        # Mark as recently used for prune_cache
+        os.utime(path)
+        return result
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cached(key, result):
+    os.makedirs(SEARCH_CACHE_DIR, exist_ok=True)
+    path = os.path.join(SEARCH_CACHE_DIR, key + '.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(result, f)
+    os.replace(path + '.tmp', path)
+
+
+def prune_cache(max_entries=SEARCH_CACHE_MAX_ENTRIES, max_age=SEARCH_CACHE_MAX_AGE):
+    """Drop cached units unused for `max_age` seconds, then the least recently used beyond `max_entries`."""
+    try:
+        names = os.listdir(SEARCH_CACHE_DIR)
+    except OSError:
+        return 0
+    entries = []
+    for name in names:
+        path = os.path.join(SEARCH_CACHE_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+    cutoff = time.time() - max_age
+    stale = [path for i, (mtime, path) in enumerate(entries) if i >= max_entries or mtime < cutoff]
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return len(stale)
+
+
+def _init_search_worker(X_path, y, folds):
+    _worker_data.update(X=np.load(X_path, mmap_mode='r'), y=y, folds=folds)
+
+
+def _fit_unit(params, ladder, fold):
+    """Grow one forest on a fold's training rows through `ladder`, scoring each step on the held-out rows."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, f1_score
+
+    X, y = _worker_data['X'], _worker_data['y']
+    train_rows, valid_rows = _worker_data['folds'][fold]
+    X_train, y_train = np.asarray(X[train_rows]), y[train_rows]
+    X_valid, y_valid = np.asarray(X[valid_rows]), y[valid_rows]
+
+    model = RandomForestClassifier(random_state=SEARCH_SEED, warm_start=True, **params)
+    steps = []
+    best = -1.0
+    for n_estimators in ladder:
+        started = time.perf_counter()
+        model.set_params(n_estimators=n_estimators)
+        model.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - started
+        y_pred = model.predict(X_valid)
+        accuracy = float(accuracy_score(y_valid, y_pred))
+        steps.append({
+            'n_estimators': n_estimators,
+            'accuracy': accuracy,
+            'f1_macro': float(f1_score(y_valid, y_pred, average='macro')),
+            'fit_seconds': round(fit_seconds, 4),
+        })
+        if accuracy < best + MIN_GAIN:
+            break
+        best = accuracy
+    return {'params': params, 'fold': fold, 'steps': steps, 'stopped_early': len(steps) < len(ladder)}
+
+
+def parameter_sets(grid):
+    keys = sorted(key for key in grid if key != 'n_estimators')
+    for values in itertools.product(*(grid[key] for key in keys)):
+        yield dict(zip(keys, values))
+
+
+def summarize(units):
+    """Mean/std fold accuracy per full parameter set, for the sets every fold reached."""
+    by_candidate = {}
+    for unit in units:
+        for step in unit['steps']:
+            params = dict(unit['params'], n_estimators=step['n_estimators'])
+            key = json.dumps(params, sort_keys=True, default=str)
+            by_candidate.setdefault(key, (params, []))[1].append(step)
+
+    candidates = []
+    for params, steps in by_candidate.values():
+        if len(steps) < SEARCH_FOLDS:
+            continue
+        accuracy = [step['accuracy'] for step in steps]
+        candidates.append({
+            'params': params,
+            'mean_accuracy': float(np.mean(accuracy)),
+            'std_accuracy': float(np.std(accuracy)),
+            'mean_f1_macro': float(np.mean([step['f1_macro'] for step in steps])),
+        })
+    # Best mean accuracy; ties go to the smaller (cheaper) forest
+    candidates.sort(key=lambda c: (-c['mean_accuracy'], c['params']['n_estimators']))
+    return candidates
+
+
+def cv_search(X, y, data_version, grid=None, n_jobs=None, progress=None):
+    """
+    K-fold search over `grid` (default PARAM_GRID) on the float32 matrix `X`. Returns
+    {"best_params", "candidates", "folds", "n_jobs", "elapsed_seconds", "cache_hits"};
+    "folds" holds every unit's per-step timing and scores.
+    """
+    from sklearn.model_selection import StratifiedKFold
+
+    report = progress or (lambda stage, fraction: None)
+    grid = grid or PARAM_GRID
+    ladder = sorted(grid['n_estimators'])
+    started = time.perf_counter()
+
+    splitter = StratifiedKFold(n_splits=SEARCH_FOLDS, shuffle=True, random_state=SEARCH_SEED)
+    folds = list(splitter.split(np.zeros(len(y)), y))
+
+    units, pending = [], []
+    for params in parameter_sets(grid):
+        for fold in range(SEARCH_FOLDS):
+            key = _unit_key(data_version, params, ladder, fold)
+            cached = _read_cached(key)
+            if cached is not None:
+                units.append(dict(cached, cached=True))
+            else:
+                pending.append((key, params, fold))
+    cache_hits = len(units)
+    total = cache_hits + len(pending)
+
+    def finish(key, result):
+        _write_cached(key, result)
+        units.append(dict(result, cached=False))
+        report('searching', len(units) / total)
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(len(pending), 1))
+    if pending:
+        # Workers map the matrix from disk instead of receiving a pickled copy each
+        X_dir = tempfile.mkdtemp(prefix='msme-search-')
+        try:
+            X_path = os.path.join(X_dir, 'X.npy')
+            np.save(X_path, X)
+            if n_jobs <= 1:
+                _init_search_worker(X_path, y, folds)
+                for key, params, fold in pending:
+                    finish(key, _fit_unit(params, ladder, fold))
+            else:
+                # Searches run on server threads, where forking is unsafe; spawn fresh workers
+                with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_search_worker, initargs=(X_path, y, folds)) as pool:
+                    futures = {pool.submit(_fit_unit, params, ladder, fold): key for key, params, fold in pending}
+                    for future in as_completed(futures):
+                        finish(futures[future], future.result())
+        finally:
+            _worker_data.clear()
+            shutil.rmtree(X_dir, ignore_errors=True)
+        prune_cache()
+
+    units.sort(key=lambda unit: (json.dumps(unit['params'], sort_keys=True, default=str), unit['fold']))
+    candidates = summarize(units)
+    if not candidates:
+        raise RuntimeError("Hyperparameter search produced no candidate scored on every fold.")
+    return {
+        'best_params': candidates[0]['params'],
+        'candidates': candidates,
+        'folds': units,
+        'n_jobs': n_jobs,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+        'cache_hits': cache_hits,
+    }
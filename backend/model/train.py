@@ -1,49 +1,117 @@
 import os
 import json
 import joblib
+import numpy as np
+import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
-from services.data_loader import load_msme_data, save_predicted_data
-from services.preprocessing import preprocess_data
+from services.data_loader import load_msme_data, get_data_version, stage_predicted_data, publish_predicted_data
+from services.preprocessing import (
+    fit_encoder, feature_columns, build_feature_pipeline, encode_chunks, CAT_COLS, GROWTH_MAP,
+)
+from services.ingest import CHUNK_ROWS
+from model.forest import export_forest
+from model.predict import forest_proba, score_frames
+from model.search import cv_search
+from services.instrumentation import stage
+from model.artifacts import (
+    MODEL_FILE, ENCODER_FILE, FOREST_FILE, METRICS_FILE, SEARCH_METRICS_FILE,
+    new_version_dir, discard_version, publish_version,
+)
 
-MODEL_DIR = os.path.dirname(__file__)
-MODEL_PATH = os.path.join(MODEL_DIR, 'model.pkl')
+def _iter_slices(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
 
-def train_model():
+def train_model(progress=None, chunk_rows=CHUNK_ROWS, search=False, n_jobs=None, param_grid=None):
+    """
+    Train the growth model and write the model, encoder, predictions and metrics.
+    
+    The model artifacts are written to a new version directory (see model.artifacts)
+    that is published in one step at the end, next to the staged predictions, so the
+    model and predictions being served keep answering until the new set is complete
+    and readers never mix files from two runs. `progress(stage, fraction)` is called
+    as training advances (used by background training jobs).
+    
+    Features are encoded straight into one float32 matrix (no one-hot frames), and
+    the portfolio is scored and written to Parquet `chunk_rows` rows at a time, so
+    beyond the served table only that matrix is held in full.
+    
+    With `search`, hyperparameters come from a k-fold search on the training split
+    (see model.search) across `n_jobs` processes, whose per-fold timings and scores
+    are written to search_metrics.json; otherwise the default forest is fitted.
+    `n_jobs` also parallelizes the final fit.
+    """
+    version_dir = new_version_dir()
+    try:
+        return _train(version_dir, progress, chunk_rows, search, n_jobs, param_grid)
+    except BaseException:
+        discard_version(version_dir)
+        raise
+
+def _train(version_dir, progress, chunk_rows, search, n_jobs, param_grid):
+    report = progress or (lambda stage, fraction: None)
+    
+    report('loading data', 0.05)
+    # Shared with the dataset store; only read below, never mutated
     df = load_msme_data()
-    df_processed = preprocess_data(df, training=True)
     
-    X = df_processed.drop('Growth_Category', axis=1)
-    y = df_processed['Growth_Category']
+    report('preprocessing', 0.1)
+    with stage('train.preprocess'):
+        encoder = fit_encoder({col: df[col].unique() for col in CAT_COLS if col in df.columns},
+                              os.path.join(version_dir, ENCODER_FILE))
+        pipeline = build_feature_pipeline(encoder, feature_columns(df.columns, encoder))
+        X = encode_chunks(pipeline, df, chunk_rows)
+        y = np.asarray(df['Growth_Category'].map(GROWTH_MAP))
     
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Splitting positions gives the same rows as splitting X and y directly
+    train_rows, test_rows = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
     
-    model = RandomForestClassifier(random_state=42)
-    model.fit(X_train, y_train)
+    params = {}
+    search_report = None
+    if search:
+        report('searching hyperparameters', 0.15)
+        with stage('train.search'):
+            # Cached fits are keyed by the data and the features they were fitted on
+            data_version = [get_data_version('msme'), pipeline['feature_names']]
+            search_report = cv_search(X[train_rows], y[train_rows], data_version, param_grid, n_jobs,
+                                      lambda stage, fraction: report(stage, 0.15 + 0.4 * fraction))
+        params = search_report['best_params']
     
-    y_pred = model.predict(X_test)
+    report('fitting model', 0.55 if search else 0.2)
+    model = RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params)
+    with stage('train.fit'):
+        model.fit(pd.DataFrame(X[train_rows], columns=pipeline['feature_names'], copy=False), y[train_rows])
+    # Serve single-threaded: parallel predict_proba sums trees in a nondeterministic order
+    model.set_params(n_jobs=None)
+    
+    report('evaluating', 0.6)
+    y_pred = model.classes_.take(forest_proba(model, X[test_rows]).argmax(axis=1))
+    y_test = y[test_rows]
     
     accuracy = accuracy_score(y_test, y_pred)
     conf_matrix = confusion_matrix(y_test, y_pred)
     class_report = classification_report(y_test, y_pred, output_dict=True)
     
     feature_importances = model.feature_importances_
-    features = X.columns
+    features = pipeline['feature_names']
     importance_dict = dict(zip(features, feature_importances))
+    # Ship the ranking inside the model so lookups never recompute it
+    model.feature_ranking_ = sorted(importance_dict.items(), key=lambda item: item[1], reverse=True)
     
-    joblib.dump(model, MODEL_PATH)
-    
-    probabilities = model.predict_proba(X)
-    
-    df['Growth_Score'] = (probabilities[:, 2] + (probabilities[:, 1] * 0.5)) * 100
+    joblib.dump(model, os.path.join(version_dir, MODEL_FILE))
     
-    y_pred_all = model.predict(X)
+    report('exporting forest', 0.65)
+    with stage('train.export_forest'):
+        export_forest(model, pipeline, os.path.join(version_dir, FOREST_FILE),
+                      pd.DataFrame(X, columns=pipeline['feature_names'], copy=False))
+    del X
     
-    rev_growth_map = {0: 'Low', 1: 'Moderate', 2: 'High'}
-    df['Predicted_Growth_Category'] = [rev_growth_map[val] for val in y_pred_all]
-    
-    save_predicted_data(df)
+    # Score and write one chunk at a time; the generator keeps only the current chunk alive
+    report('scoring portfolio', 0.7)
+    with stage('train.score_and_write'):
+        staged_predictions = stage_predicted_data(score_frames(model, pipeline, _iter_slices(df, chunk_rows)))
     
     metrics = {
         "accuracy": accuracy,
@@ -51,9 +119,22 @@ def train_model():
         "classification_report": class_report,
         "feature_importance": importance_dict
     }
+    if search_report is not None:
+        metrics["search"] = {
+            "best_params": search_report['best_params'],
+            "cv_accuracy": search_report['candidates'][0]['mean_accuracy'],
+            "cv_accuracy_std": search_report['candidates'][0]['std_accuracy'],
+        }
+        with open(os.path.join(version_dir, SEARCH_METRICS_FILE), 'w') as f:
+            json.dump(search_report, f, default=str)
     
-    metrics_path = os.path.join(MODEL_DIR, 'metrics.json')
-    with open(metrics_path, 'w') as f:
+    with open(os.path.join(version_dir, METRICS_FILE), 'w') as f:
         json.dump(metrics, f)
+    
+    # One pointer swap publishes every model artifact together
+    report('publishing', 0.95)
+    with stage('train.publish'):
+        publish_version(version_dir)
+        publish_predicted_data(staged_predictions)
         
     return metrics
@@ -0,0 +1,128 @@
+import zlib
+
+# brotli is optional; without it clients asking for br get gzip instead
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'application/vnd.apache.arrow.stream', 'text/')
+MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def _accepted(scope):
+    """Content codings the client accepts (q > 0), lower-cased."""
+    header = dict(scope.get('headers', [])).get(b'accept-encoding', b'').decode('latin-1')
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class _Gzip:
+    encoding = 'gzip'
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def process(self, data, final):
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    encoding = 'br'
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def process(self, data, final):
+        out = self._compressor.process(data)
+        return out + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON, NDJSON, Arrow and text responses with brotli
+    (when installed) or gzip, whichever the client's Accept-Encoding allows. Bodies
+    sent in one message are compressed only from MINIMUM_SIZE bytes; streamed
+    bodies are compressed chunk by chunk and flushed after each one.
+    """
+
+    def __init__(self, app, minimum_size=MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accepted = _accepted(scope)
+        if brotli is not None and 'br' in accepted:
+            codec = _Brotli
+        elif 'gzip' in accepted:
+            codec = _Gzip
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        state = {'start': None, 'compressor': None, 'passthrough': False}
+
+        async def compress(message):
+            if state['passthrough']:
+                await send(message)
+                return
+            if message['type'] == 'http.response.start':
+                state['start'] = message
+                return
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            start = state['start']
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if state['compressor'] is None:
+                headers = {key.lower(): value for key, value in start['headers']}
+                content_type = headers.get(b'content-type', b'').decode('latin-1')
+                eligible = (
+                    b'content-encoding' not in headers
+                    and content_type.startswith(COMPRESSIBLE_TYPES)
+                    and (more_body or len(body) >= self.minimum_size)
+                )
+                if not eligible:
+                    state['passthrough'] = True
+                    await send(start)
+                    await send(message)
+                    return
+                state['compressor'] = codec()
+                body = state['compressor'].process(body, not more_body)
+                start_headers = [(key, value) for key, value in start['headers']
+                                 if key.lower() not in (b'content-length', b'vary', b'etag')]
+                vary = headers.get(b'vary')
+                etag = headers.get(b'etag')
+                if etag is not None:
+                    # The encoded bytes differ from the identity body, so a strong tag would lie
+                    start_headers.append((b'etag', etag if etag.startswith(b'W/') else b'W/' + etag))
+                start_headers.append((b'content-encoding', codec.encoding.encode()))
+                start_headers.append((b'vary', vary + b', Accept-Encoding' if vary else b'Accept-Encoding'))
+                if not more_body:
+                    start_headers.append((b'content-length', str(len(body)).encode()))
+                await send(dict(start, headers=start_headers))
+            else:
+                body = state['compressor'].process(body, not more_body)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, compress)
@@ -1,17 +1,248 @@
 import pandas as pd
+import hashlib
+import json
 import os
+import threading
+from services.instrumentation import stage
+from services import shared_store
+from services import ingest
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
-MSME_DATA_PATH = os.path.join(DATA_DIR, 'MSME_PROJECT_DATA.xlsx')
-PREDICTED_DATA_PATH = os.path.join(DATA_DIR, 'MSME_WITH_PREDICTIONS.xlsx')
+# MSME_DATA_DIR points the service at another dataset (e.g. synthetic benchmark data)
+DATA_DIR = os.environ.get('MSME_DATA_DIR', os.path.join(os.path.dirname(__file__), '..', 'data'))
+MSME_DATA_PATH = os.path.join(DATA_DIR, 'MSME_Project_Data.xlsx')
+PREDICTED_DATA_PATH = os.path.join(DATA_DIR, 'MSME_WITH_PREDICTIONS.parquet')
+PREDICTED_XLSX_PATH = os.path.join(DATA_DIR, 'MSME_WITH_PREDICTIONS.xlsx')
+SCHEME_DATA_PATH = os.path.join(DATA_DIR, 'Scheme_Dataset_Final.xlsx')
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
 
+# Each table is served from the first of its source files that exists, so a
+# Parquet or CSV export of a dataset takes over from the bundled workbook.
+TABLE_SOURCES = {
+    'msme': [os.path.splitext(MSME_DATA_PATH)[0] + ext for ext in ingest.SOURCE_EXTENSIONS],
+    'predictions': [PREDICTED_DATA_PATH, PREDICTED_XLSX_PATH],
+    'schemes': [os.path.splitext(SCHEME_DATA_PATH)[0] + ext for ext in ingest.SOURCE_EXTENSIONS],
+}
+
+# Write an .xlsx copy of the predictions next to the Parquet file on every publish
+EXPORT_PREDICTIONS_XLSX = os.environ.get('MSME_EXPORT_XLSX', '0') == '1'
+
+# Low-cardinality text columns are held as categoricals; everything else keeps
+# the dtype read_excel infers so downstream arithmetic is unchanged.
+CATEGORICAL_COLUMNS = [
+    'Sector', 'Ownership_Type', 'Category', 'Location_Type', 'Technology_Level',
+    'Growth_Category', 'Predicted_Growth_Category',
+]
+
+# Column that identifies a row; tables that have it get a key -> row position index
+KEY_COLUMN = 'MSME_ID'
+
+# Process-wide dataset store: table name -> {"frame", "index", "path", "mtime_ns", "size", "hash"}.
+# _store_lock only guards lookups and swaps of entries; a reload holds its table's lock.
+_store = {}
+_store_lock = threading.Lock()
+_table_locks = {name: threading.Lock() for name in TABLE_SOURCES}
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _compact(df):
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _build_index(df):
+    """Map each key to its first row position (what a boolean scan + iloc[0] would find)."""
+    if KEY_COLUMN not in df.columns:
+        return {}
+    index = {}
+    for position, key in enumerate(df[KEY_COLUMN].tolist()):
+        index.setdefault(key, position)
+    return index
+
+
+def _cache_paths(name):
+    return os.path.join(CACHE_DIR, name + '.parquet'), os.path.join(CACHE_DIR, name + '.json')
+
+
+def _read_cache(name, source_hash):
+    parquet_path, meta_path = _cache_paths(name)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('hash') != source_hash:
+            return None
+        return pd.read_parquet(parquet_path)
+    except (OSError, ValueError, ImportError):
+        return None
+
+
+def _write_cache(name, df, source_hash):
+    # Parquet needs pyarrow (or fastparquet); without it the store still works,
+    # it just re-parses the workbook on a cold start.
+    parquet_path, meta_path = _cache_paths(name)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = parquet_path + '.tmp'
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, parquet_path)
+        with open(meta_path, 'w') as f:
+            json.dump({'hash': source_hash}, f)
+    except (OSError, ValueError, ImportError):
+        pass
+
+
+def table_path(name):
+    """The source file a table is currently read from, or None if none exists."""
+    for path in TABLE_SOURCES[name]:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _parse_table(name, path, source_hash):
+    if path.endswith('.parquet'):
+        with stage('load.read_parquet'):
+            return _compact(pd.read_parquet(path))
+
+    with stage('load.parquet_cache'):
+        df = _read_cache(name, source_hash)
+    if df is None:
+        if path.endswith('.csv'):
+            with stage('load.read_csv'):
+                header = pd.read_csv(path, nrows=0).columns
+                df = pd.read_csv(path, dtype={col: 'category' for col in CATEGORICAL_COLUMNS if col in header})
+        else:
+            with stage('load.read_excel'):
+                df = _compact(pd.read_excel(path))
+        with stage('load.write_cache'):
+            _write_cache(name, df, source_hash)
+    return df
+
+
+def _unchanged(entry, path, stat):
+    return entry is not None and entry['path'] == path and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size
+
+
+def _load_entry(name):
+    """
+    Return the store entry for a table, (re)loading it only when the source file
+    changed. A changed mtime alone triggers a hash check, so touching a file
+    without editing it does not force a re-parse.
+    """
+    path = table_path(name)
+    if path is None:
+        with _store_lock:
+            _store.pop(name, None)
+        return None
+
+    stat = os.stat(path)
+    with _store_lock:
+        entry = _store.get(name)
+    if _unchanged(entry, path, stat):
+        return entry
+
+    # Hash and parse under this table's lock only, so reads of other tables never wait
+    with _table_locks[name]:
+        with _store_lock:
+            entry = _store.get(name)
+        if _unchanged(entry, path, stat):
+            # Another request reloaded it while this one waited
+            return entry
+
+        with stage('load.hash'):
+            source_hash = _file_hash(path)
+        if entry and entry['hash'] == source_hash:
+            entry = dict(entry, path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        else:
+            if shared_store.SHARED_ENABLED:
+                with stage('load.shared_attach'):
+                    df = shared_store.shared_frame(name, source_hash, lambda: _parse_table(name, path, source_hash))
+            else:
+                df = _parse_table(name, path, source_hash)
+            entry = {
+                'frame': df,
+                'index': _build_index(df),
+                'path': path,
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'hash': source_hash,
+            }
+
+        with _store_lock:
+            _store[name] = entry
+        return entry
+
+
+def _load_table(name):
+    """Return the in-memory frame for a table (see _load_entry), or None if it has no source file."""
+    entry = _load_entry(name)
+    return None if entry is None else entry['frame']
+
+
+def seed_cache(name, df):
+    """Store an already-parsed frame as the Parquet cache for the table's current file."""
+    _write_cache(name, _compact(df.copy()), _file_hash(table_path(name)))
+
+
+def get_data_version(name):
+    """Content hash of the table currently served by the store (None if missing)."""
+    entry = _load_entry(name)
+    return None if entry is None else entry['hash']
+
+
+def get_indexed_table(name):
+    """Return (frame, key -> row position index) for a table, or (None, {}) if missing."""
+    entry = _load_entry(name)
+    if entry is None:
+        return None, {}
+    return entry['frame'], entry['index']
+
+
+# Frames returned below are shared by every request; copy before mutating.
 def load_msme_data():
-    return pd.read_excel(MSME_DATA_PATH)
+    return _load_table('msme')
+
 
 def load_predicted_data():
-    if os.path.exists(PREDICTED_DATA_PATH):
-        return pd.read_excel(PREDICTED_DATA_PATH)
-    return None
+    return _load_table('predictions')
+
+
+def load_scheme_data():
+    return _load_table('schemes')
+
+
+def stage_predicted_data(chunks, export_xlsx=EXPORT_PREDICTIONS_XLSX):
+    """
+    Stream predictions (a frame or an iterable of frames) to a staged Parquet file,
+    plus a staged workbook copy if `export_xlsx`. Returns the (staged, final) path
+    pairs for publish_predicted_data.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    staged = [(PREDICTED_DATA_PATH + '.tmp.parquet', PREDICTED_DATA_PATH)]
+    ingest.write_parquet(chunks, staged[0][0])
+    if export_xlsx:
+        # Re-read the staged Parquet so the workbook is also written chunk by chunk
+        staged.append((PREDICTED_XLSX_PATH + '.tmp.xlsx', PREDICTED_XLSX_PATH))
+        ingest.write_xlsx(ingest.iter_chunks(staged[0][0]), staged[1][0])
+    return staged
+
+
+def publish_predicted_data(staged):
+    """Swap staged predictions in, so readers never see a half-written file."""
+    for staged_path, path in staged:
+        os.replace(staged_path, path)
+    # Re-read through the store so the served frame matches what is on disk.
+    _load_table('predictions')
+
 
 def save_predicted_data(df):
-    df.to_excel(PREDICTED_DATA_PATH, index=False)
+    publish_predicted_data(stage_predicted_data(df))
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import re
+import threading
+from services.data_loader import load_scheme_data
+
+# Scheme rule column -> (MSME column it is matched against, values that mean "any")
+ELIGIBILITY_RULES = {
+    'sector': ('Eligible_Sectors', 'Sector', {'all'}),
+    'category': ('Target_Category', 'Category', {'all'}),
+    'location': ('Location_Criteria', 'Location_Type', {'all', 'urban/rural'}),
+}
+
+_TOKEN_SPLIT = re.compile(r'[/,;]')
+
+_cached_index = None
+# Scheme frame the index was compiled from (the store returns a new frame per data version)
+_cached_frame = None
+_index_lock = threading.Lock()
+
+
+def _normalize(value):
+    return str(value).strip().lower()
+
+
+def _tokenize(value, wildcards):
+    """Parse one rule cell into (is_wildcard, token set). Blank cells match nothing."""
+    if pd.isna(value):
+        return False, set()
+    text = _normalize(value)
+    if text in wildcards:
+        return True, set()
+    tokens = {tok.strip() for tok in _TOKEN_SPLIT.split(text) if tok.strip()}
+    return bool(tokens & wildcards), tokens - wildcards
+
+
+def compile_scheme_index(scheme_df):
+    """
+    Compile the scheme eligibility rules into per-attribute boolean masks over schemes.
+    For each attribute, masks[vocab[token]] marks the schemes accepting that token and
+    the extra last row marks the schemes accepting any value (used for unseen tokens).
+    """
+    n_schemes = len(scheme_df)
+    index = {'n_schemes': n_schemes}
+
+    for attr, (rule_col, msme_col, wildcards) in ELIGIBILITY_RULES.items():
+        parsed = [_tokenize(v, wildcards) for v in scheme_df[rule_col]]
+        vocab = {tok: i for i, tok in enumerate(sorted(set().union(*[tokens for _, tokens in parsed])))}
+
+        masks = np.zeros((len(vocab) + 1, n_schemes), dtype=bool)
+        for j, (is_wildcard, tokens) in enumerate(parsed):
+            if is_wildcard:
+                masks[:, j] = True
+            for tok in tokens:
+                masks[vocab[tok], j] = True
+
+        index[attr] = {'msme_column': msme_col, 'vocab': vocab, 'masks': masks}
+
+    return index
+
+
+def get_scheme_index(scheme_df=None):
+    """
+    Return the compiled index for `scheme_df` (the current scheme dataset by default),
+    rebuilding it when the data changes.
+    """
+    global _cached_index, _cached_frame
+    if scheme_df is None:
+        scheme_df = load_scheme_data()
+    with _index_lock:
+        if _cached_index is None or _cached_frame is not scheme_df:
+            _cached_index = compile_scheme_index(scheme_df)
+            _cached_frame = scheme_df
+        return _cached_index
+
+
+def _value_codes(rule, values):
+    # Factorize first so only the distinct MSME values go through Python string handling.
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    other = len(rule['vocab'])
+    lookup = np.array([rule['vocab'].get(_normalize(u), other) for u in uniques] + [other], dtype=np.int64)
+    return lookup[codes]
+
+
+def eligible_mask(index, msme):
+    """Boolean mask over schemes for a single MSME record (dict or Series)."""
+    mask = np.ones(index['n_schemes'], dtype=bool)
+    for attr in ELIGIBILITY_RULES:
+        rule = index[attr]
+        value = msme.get(rule['msme_column'])
+        row = len(rule['vocab']) if pd.isna(value) else rule['vocab'].get(_normalize(value), len(rule['vocab']))
+        mask &= rule['masks'][row]
+    return mask
+
+
+def eligibility_groups(index, msme_df):
+    """
+    Group MSMEs by their (sector, category, location) codes.
+    Returns (group_of_row, group_masks) where group_masks[g] is the scheme mask shared
+    by every MSME in group g, so the AND work is done once per distinct combination.
+    """
+    combined = np.zeros(len(msme_df), dtype=np.int64)
+    for attr in ELIGIBILITY_RULES:
+        rule = index[attr]
+        codes = _value_codes(rule, msme_df[rule['msme_column']])
+        combined = combined * (len(rule['vocab']) + 1) + codes
+
+    combos, group_of_row = np.unique(combined, return_inverse=True)
+    group_masks = np.ones((len(combos), index['n_schemes']), dtype=bool)
+    for attr in reversed(list(ELIGIBILITY_RULES)):
+        rule = index[attr]
+        width = len(rule['vocab']) + 1
+        group_masks &= rule['masks'][combos % width]
+        combos = combos // width
+
+    return group_of_row.reshape(-1), group_masks
+
+
+def eligible_pairs(index, msme_df):
+    """
+    All eligible (msme_row, scheme_row) pairs as two int arrays, ordered by MSME row
+    and then scheme row, i.e. the same order as a nested loop over both tables.
+    """
+    group_of_row, group_masks = eligibility_groups(index, msme_df)
+
+    group_counts = group_masks.sum(axis=1)
+    group_schemes = np.nonzero(group_masks)[1]
+    group_starts = np.concatenate(([0], np.cumsum(group_counts)[:-1]))
+
+    row_counts = group_counts[group_of_row]
+    msme_rows = np.repeat(np.arange(len(msme_df)), row_counts)
+    pair_starts = np.concatenate(([0], np.cumsum(row_counts)[:-1]))
+    within = np.arange(len(msme_rows)) - np.repeat(pair_starts, row_counts)
+    scheme_rows = group_schemes[group_starts[group_of_row[msme_rows]] + within]
+
+    return msme_rows, scheme_rows
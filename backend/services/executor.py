@@ -0,0 +1,20 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from services.instrumentation import profiled
+
+# Request handlers hand their pandas/NumPy/scikit-learn work to this pool so the
+# event loop keeps serving other requests. The size caps concurrent CPU work.
+REQUEST_WORKERS = int(os.environ.get('MSME_REQUEST_WORKERS', min(4, os.cpu_count() or 1)))
+# Background jobs (training) get their own pool so they never starve requests.
+JOB_WORKERS = int(os.environ.get('MSME_JOB_WORKERS', 1))
+
+request_executor = ThreadPoolExecutor(max_workers=REQUEST_WORKERS, thread_name_prefix='msme-request')
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='msme-job')
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call on the request pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request_executor, partial(profiled(fn), *args, **kwargs))
@@ -0,0 +1,118 @@
+"""
+Chunked readers and writers for tabular files, so large inputs and outputs never
+have to sit in memory as one frame.
+
+CSV and Parquet are read incrementally; workbooks are streamed row by row through
+openpyxl's read-only mode. Writers consume any iterable of frames (typically a
+generator), one chunk at a time.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+# Rows per chunk when reading or scoring a file
+CHUNK_ROWS = 50_000
+
+SOURCE_EXTENSIONS = ('.parquet', '.csv', '.xlsx')
+
+
+def _categorize(df, categorical):
+    for col in categorical:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _iter_xlsx(path, chunk_rows):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS, categorical=()):
+    """
+    Yield the rows of a CSV, Parquet or XLSX file as frames of at most `chunk_rows`
+    rows. Columns named in `categorical` come back as categoricals. Raises
+    ValueError for other file types.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        header = pd.read_csv(path, nrows=0).columns
+        dtype = {col: 'category' for col in categorical if col in header}
+        with pd.read_csv(path, chunksize=chunk_rows, dtype=dtype) as reader:
+            yield from reader
+    elif ext == '.parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield _categorize(batch.to_pandas(), categorical)
+    elif ext == '.xlsx':
+        for chunk in _iter_xlsx(path, chunk_rows):
+            yield _categorize(chunk, categorical)
+    else:
+        raise ValueError(f"Unsupported file type '{ext}' (expected one of {', '.join(SOURCE_EXTENSIONS)})")
+
+
+def _plain(df):
+    # Chunks carry their own category sets; write the values so every chunk has one schema
+    categorical = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    return df.astype({col: df[col].cat.categories.dtype for col in categorical})
+
+
+def write_parquet(chunks, path):
+    """Write an iterable of frames to one Parquet file, a row group per chunk. Returns the row count."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(_plain(chunk), preserve_index=False,
+                                         schema=writer.schema if writer is not None else None)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("No rows to write")
+    return rows
+
+
+def _cell(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def write_xlsx(chunks, path):
+    """Write an iterable of frames to a workbook in write-only mode (rows are streamed, not buffered)."""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    rows = 0
+    for chunk in chunks:
+        if rows == 0:
+            sheet.append([str(col) for col in chunk.columns])
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append([_cell(value) for value in row])
+        rows += len(chunk)
+    workbook.save(path)
+    return rows
@@ -0,0 +1,175 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds (Prometheus `le`), in seconds and bytes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# Per-request profiling is off unless the deployment opts in
+PROFILING_ENABLED = os.environ.get('MSME_PROFILING', '0') == '1'
+PROFILE_TOP = 40
+
+# (metric, sorted label items) -> {"buckets", "counts", "sum", "count"}
+_histograms = {}
+_lock = threading.Lock()
+
+_HELP = {
+    'msme_stage_duration_seconds': 'Time spent in a named hot-path stage',
+    'msme_http_request_duration_seconds': 'Request latency by route',
+    'msme_http_response_size_bytes': 'Response body size by route',
+    'msme_payload_bytes': 'Uncompressed size of rendered cached results by namespace and format',
+}
+
+# Set for the duration of a profiled request; run_blocking profiles its work into it
+_active_profile = contextvars.ContextVar('msme_active_profile', default=None)
+
+
+def observe(metric, labels, value, buckets=LATENCY_BUCKETS):
+    key = (metric, tuple(sorted(labels.items())))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                hist['counts'][i] += 1
+                break
+        hist['sum'] += value
+        hist['count'] += 1
+
+
+@contextmanager
+def stage(name):
+    """Time a named stage into msme_stage_duration_seconds{stage=name}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('msme_stage_duration_seconds', {'stage': name}, time.perf_counter() - started)
+
+
+def _labels(items):
+    return ','.join(f'{k}="{v}"' for k, v in items)
+
+
+def render_prometheus(gauges=None):
+    """All histograms (plus `gauges`: name -> value) in Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        snapshot = sorted((key, dict(hist, counts=list(hist['counts']))) for key, hist in _histograms.items())
+
+    seen = set()
+    for (metric, labels), hist in snapshot:
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# HELP {metric} {_HELP.get(metric, metric)}")
+            lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, count in zip(hist['buckets'], hist['counts']):
+            cumulative += count
+            lines.append(f"{metric}_bucket{{{_labels(labels + (('le', bound),))}}} {cumulative}")
+        lines.append(f"{metric}_bucket{{{_labels(labels + (('le', '+Inf'),))}}} {hist['count']}")
+        lines.append(f"{metric}_sum{{{_labels(labels)}}} {hist['sum']}")
+        lines.append(f"{metric}_count{{{_labels(labels)}}} {hist['count']}")
+
+    for name, value in (gauges or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def profiled(fn):
+    """Wrap `fn` so it runs under the active request's profiler, if there is one."""
+    profile = _active_profile.get()
+    if profile is None:
+        return fn
+
+    def run(*args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            with profile['lock']:
+                profile['profilers'].append(profiler)
+    return run
+
+
+def _profile_report(profile, elapsed, status):
+    out = io.StringIO()
+    out.write(f"status {status}, wall time {elapsed * 1000:.1f} ms\n\n")
+    if not profile['profilers']:
+        out.write("No blocking work ran for this request.\n")
+        return out.getvalue()
+    stats = pstats.Stats(profile['profilers'][0], stream=out)
+    for profiler in profile['profilers'][1:]:
+        stats.add(profiler)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and response size per route template. With
+    MSME_PROFILING=1, `?profile=1` or an `X-Profile: 1` header replaces the response
+    with a cProfile report of the request's blocking work.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths = None
+
+    def _route(self, scope):
+        if self._route_paths is None and 'app' in scope:
+            self._route_paths = {route.endpoint: route.path for route in scope['app'].routes if hasattr(route, 'endpoint')}
+        return (self._route_paths or {}).get(scope.get('endpoint'), 'unmatched')
+
+    @staticmethod
+    def _wants_profile(scope):
+        if not PROFILING_ENABLED:
+            return False
+        query = scope.get('query_string', b'').decode()
+        flags = dict(part.partition('=')[::2] for part in query.split('&') if part)
+        header = dict(scope.get('headers', [])).get(b'x-profile', b'').decode()
+        return flags.get('profile') in ('1', 'true') or header in ('1', 'true')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = {'status': 500, 'size': 0}
+        profile = {'profilers': [], 'lock': threading.Lock()} if self._wants_profile(scope) else None
+
+        async def record(message):
+            if message['type'] == 'http.response.start':
+                state['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                state['size'] += len(message.get('body', b''))
+            if profile is None:
+                await send(message)
+
+        token = _active_profile.set(profile)
+        try:
+            await self.app(scope, receive, record)
+        finally:
+            _active_profile.reset(token)
+            elapsed = time.perf_counter() - started
+            route = self._route(scope)
+            observe('msme_http_request_duration_seconds',
+                    {'method': scope['method'], 'route': route, 'status': state['status']}, elapsed)
+            observe('msme_http_response_size_bytes',
+                    {'method': scope['method'], 'route': route}, state['size'], SIZE_BUCKETS)
+
+        if profile is not None:
+            body = _profile_report(profile, elapsed, state['status']).encode()
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8'),
+                                    (b'content-length', str(len(body)).encode())]})
+            await send({'type': 'http.response.body', 'body': body})
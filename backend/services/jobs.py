@@ -0,0 +1,87 @@
+import threading
+import time
+import traceback
+import uuid
+from services.executor import job_executor
+
+# Finished jobs kept around for status/result lookups
+MAX_FINISHED_JOBS = 50
+
+# job id -> job record (see _public for the fields exposed over the API)
+_jobs = {}
+_lock = threading.Lock()
+
+
+def _public(job):
+    return {k: v for k, v in job.items() if k != 'result'}
+
+
+def _prune():
+    finished = [j for j in _jobs.values() if j['status'] in ('succeeded', 'failed')]
+    finished.sort(key=lambda j: j['finished_at'])
+    for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del _jobs[job['id']]
+
+
+def _run(job_id, fn):
+    def progress(stage, fraction):
+        with _lock:
+            _jobs[job_id]['stage'] = stage
+            _jobs[job_id]['progress'] = round(float(fraction), 3)
+
+    with _lock:
+        _jobs[job_id].update(status='running', started_at=time.time())
+    try:
+        result = fn(progress)
+        with _lock:
+            _jobs[job_id].update(status='succeeded', stage='done', progress=1.0, result=result)
+    except Exception as e:
+        traceback.print_exc()
+        with _lock:
+            _jobs[job_id].update(status='failed', error=str(e))
+    finally:
+        with _lock:
+            _jobs[job_id]['finished_at'] = time.time()
+            _prune()
+
+
+def submit_job(kind, fn):
+    """
+    Queue `fn(progress)` on the job pool and return its public record. `progress(stage,
+    fraction)` lets the job report where it is. Only one job of a kind is active at a
+    time: submitting while one is queued or running returns that job instead.
+    """
+    with _lock:
+        for job in _jobs.values():
+            if job['kind'] == kind and job['status'] in ('queued', 'running'):
+                return _public(job)
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            'id': job_id,
+            'kind': kind,
+            'status': 'queued',
+            'stage': 'queued',
+            'progress': 0.0,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+        }
+        record = _public(_jobs[job_id])
+
+    job_executor.submit(_run, job_id, fn)
+    return record
+
+
+def get_job(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        return _public(job) if job else None
+
+
+def get_job_result(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        return job['result'] if job else None
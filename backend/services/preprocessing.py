@@ -1,24 +1,48 @@
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import OneHotEncoder
 import joblib
 import os
+import threading
+from model.artifacts import ENCODER_FILE, artifact_path
 
-ENCODER_PATH = os.path.join(os.path.dirname(__file__), '..', 'model', 'encoder.pkl')
+CAT_COLS = ['Sector', 'Ownership_Type', 'Category', 'Location_Type', 'Technology_Level']
+GROWTH_MAP = {'Low': 0, 'Moderate': 1, 'High': 2}
+# Rows encoded at a time when building a full feature matrix
+ENCODE_CHUNK_ROWS = 50_000
 
-def preprocess_data(df, training=True):
+_cached_encoder = None
+_cached_encoder_stamp = None
+_encoder_lock = threading.Lock()
+
+def load_encoder(encoder_path=None):
+    """Return the fitted encoder (of the served artifact set by default), loading it from disk only when the file changed."""
+    global _cached_encoder, _cached_encoder_stamp
+    encoder_path = encoder_path or artifact_path(ENCODER_FILE)
+    if not os.path.exists(encoder_path):
+        return None
+    stat = os.stat(encoder_path)
+    stamp = (encoder_path, stat.st_mtime_ns, stat.st_size)
+    with _encoder_lock:
+        if _cached_encoder is None or stamp != _cached_encoder_stamp:
+            _cached_encoder = joblib.load(encoder_path)
+            _cached_encoder_stamp = stamp
+        return _cached_encoder
+
+def preprocess_data(df, training=True, encoder_path=None):
+    encoder_path = encoder_path or artifact_path(ENCODER_FILE)
     df_processed = df.copy()
 
     if 'MSME_ID' in df_processed.columns:
         df_processed = df_processed.drop('MSME_ID', axis=1)
 
     if 'Growth_Category' in df_processed.columns:
-        growth_map = {'Low': 0, 'Moderate': 1, 'High': 2}
-        df_processed['Growth_Category'] = df_processed['Growth_Category'].map(growth_map)
+        df_processed['Growth_Category'] = df_processed['Growth_Category'].map(GROWTH_MAP)
 
-    cat_cols = ['Sector', 'Ownership_Type', 'Category', 'Location_Type', 'Technology_Level']
-    cat_cols_present = [col for col in cat_cols if col in df_processed.columns]
+    cat_cols_present = [col for col in CAT_COLS if col in df_processed.columns]
 
     if training:
+        # Imported here so the serving path (encode_records) never loads scikit-learn
+        from sklearn.preprocessing import OneHotEncoder
         encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
         encoded_cols = encoder.fit_transform(df_processed[cat_cols_present])
         encoded_df = pd.DataFrame(encoded_cols, columns=encoder.get_feature_names_out(cat_cols_present))
@@ -26,10 +50,10 @@ def preprocess_data(df, training=True):
         df_processed = df_processed.drop(cat_cols_present, axis=1)
         df_processed = pd.concat([df_processed, encoded_df], axis=1)
         
-        joblib.dump(encoder, ENCODER_PATH)
+        joblib.dump(encoder, encoder_path)
     else:
-        if os.path.exists(ENCODER_PATH):
-            encoder = joblib.load(ENCODER_PATH)
+        encoder = load_encoder(encoder_path)
+        if encoder is not None:
             encoded_cols = encoder.transform(df_processed[cat_cols_present])
             encoded_df = pd.DataFrame(encoded_cols, columns=encoder.get_feature_names_out(cat_cols_present))
             
@@ -37,3 +61,74 @@ def preprocess_data(df, training=True):
             df_processed = pd.concat([df_processed, encoded_df], axis=1)
             
     return df_processed
+
+def fit_encoder(categories, encoder_path):
+    """
+    Fit and save the one-hot encoder from each categorical column's distinct values
+    (`categories`: column -> values). The encoder only learns the sorted distinct
+    values, so this matches fitting on every row without building a dense frame.
+    """
+    from sklearn.preprocessing import OneHotEncoder
+    values = {col: np.asarray(categories[col], dtype=object) for col in CAT_COLS if col in categories}
+    width = max((len(v) for v in values.values()), default=0)
+    # Columns must be equally long; pad by repeating values, which adds no categories
+    frame = pd.DataFrame({col: np.resize(v, width) for col, v in values.items()})
+    encoder = OneHotEncoder(sparse_output=False, handle_unknown='ignore')
+    encoder.fit(frame)
+    joblib.dump(encoder, encoder_path)
+    return encoder
+
+def feature_columns(columns, encoder):
+    """Model feature order produced by preprocess_data: numeric columns, then one-hot columns."""
+    excluded = {'MSME_ID', 'Growth_Category', *encoder.feature_names_in_}
+    numeric = [col for col in columns if col not in excluded]
+    return numeric + list(encoder.get_feature_names_out(encoder.feature_names_in_))
+
+def build_feature_pipeline(encoder, feature_names):
+    """
+    Precompute where every input lands in the model's feature matrix: numeric columns
+    map to one position, and each known (categorical column, value) maps to the
+    position of its one-hot column. Unknown values encode as all zeros, like the
+    encoder's handle_unknown='ignore'.
+    """
+    positions = {name: i for i, name in enumerate(feature_names)}
+    categorical = {}
+    encoded = set()
+    for col, categories in zip(encoder.feature_names_in_, encoder.categories_):
+        mapping = {}
+        for value in categories:
+            name = f"{col}_{value}"
+            if name in positions:
+                mapping[str(value)] = positions[name]
+                encoded.add(name)
+        categorical[col] = mapping
+
+    numeric = [(name, i) for name, i in positions.items() if name not in encoded]
+    return {'feature_names': list(feature_names), 'numeric': numeric, 'categorical': categorical}
+
+def encode_records(pipeline, df):
+    """Encode raw MSME rows into the model's feature matrix without building one-hot frames."""
+    X = np.zeros((len(df), len(pipeline['feature_names'])), dtype=np.float32)
+    numeric_cols = [col for col, _ in pipeline['numeric']]
+    numeric_idx = [i for _, i in pipeline['numeric']]
+    try:
+        X[:, numeric_idx] = df[numeric_cols].to_numpy(dtype=float)
+    except (TypeError, ValueError):
+        X[:, numeric_idx] = df[numeric_cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+    rows = np.arange(len(df))
+    for col, mapping in pipeline['categorical'].items():
+        idx = np.array([mapping.get(str(value), -1) for value in df[col].tolist()], dtype=np.int64)
+        known = idx >= 0
+        X[rows[known], idx[known]] = 1.0
+    return X
+
+def encode_chunks(pipeline, df, chunk_rows=ENCODE_CHUNK_ROWS):
+    """encode_records over row slices into one preallocated matrix, keeping temporaries chunk-sized."""
+    X = np.empty((len(df), len(pipeline['feature_names'])), dtype=np.float32)
+    for start in range(0, len(df), chunk_rows):
+        X[start:start + chunk_rows] = encode_records(pipeline, df.iloc[start:start + chunk_rows])
+    return X
+
+def required_columns(pipeline):
+    return [col for col, _ in pipeline['numeric']] + list(pipeline['categorical'])
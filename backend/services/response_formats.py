@@ -0,0 +1,51 @@
+"""
+Renderers turning a computed result into response bytes.
+
+'json' is the default row-oriented encoding. 'columns' is for results whose large
+sections are already column arrays (dicts of lists): they are dumped directly, skipping
+the per-value jsonable_encoder walk. 'arrow' writes the "allocations" columns as an
+Arrow IPC stream and carries every other section as JSON in the schema metadata
+(needs pyarrow).
+"""
+import json
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+def _native(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def render_json(result):
+    return JSONResponse(content=jsonable_encoder(result)).body, 'application/json'
+
+
+def render_columns(result):
+    body = json.dumps(result, default=_native, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+    return body.encode('utf-8'), 'application/json'
+
+
+def render_arrow(result, table_key='allocations'):
+    import pyarrow as pa
+    columns = result.get(table_key) or {}
+    metadata = {key: json.dumps(value, default=_native) for key, value in result.items() if key != table_key}
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes(), ARROW_MEDIA_TYPE
+
+
+RENDERERS = {
+    'json': render_json,
+    'columns': render_columns,
+    'arrow': render_arrow,
+}
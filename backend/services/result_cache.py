@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi.responses import Response
+from services.data_loader import TABLE_SOURCES, table_path, get_data_version
+from services.instrumentation import stage, observe, SIZE_BUCKETS
+from services.response_formats import RENDERERS
+
+MAX_ENTRIES = int(os.environ.get('MSME_CACHE_MAX_ENTRIES', 256))
+TTL_SECONDS = float(os.environ.get('MSME_CACHE_TTL', 600))
+
+# key -> {"body": rendered bytes, "media_type", "serialize_ms", "expires": monotonic deadline, "sources"}, in LRU order
+_entries = OrderedDict()
+# key -> threading.Event set once the leader has stored (or failed to store) the result
+_inflight = {}
+_lock = threading.Lock()
+
+_stats = {
+    'hits': 0, 'misses': 0, 'coalesced': 0, 'not_modified': 0,
+    'evictions': 0, 'expired': 0, 'invalidations': 0,
+}
+
+
+def source_version(sources):
+    """
+    Version stamp for a result's inputs: dataset tables by name (content hash from the
+    dataset store) or file paths (mtime/size). Returns (stamp, last_modified_epoch).
+    """
+    parts = []
+    last_modified = 0.0
+    for source in sources:
+        path = (table_path(source) or '') if source in TABLE_SOURCES else source
+        if source in TABLE_SOURCES:
+            parts.append(f"{source}:{get_data_version(source)}")
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}")
+        else:
+            parts.append(f"{os.path.basename(path)}:missing")
+        if os.path.exists(path):
+            last_modified = max(last_modified, os.path.getmtime(path))
+    return '|'.join(parts), last_modified
+
+
+def _cache_key(namespace, params, version):
+    raw = json.dumps([namespace, params, version], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get_or_compute(key, compute, sources=(), fmt='json', namespace=None):
+    """
+    Return the cached entry for `key`, computing it at most once across concurrent
+    callers (single-flight): followers wait for the leader instead of recomputing.
+    The result is rendered with RENDERERS[fmt]; its size is recorded per namespace.
+    `sources` are recorded so invalidate() can drop just the entries built on them.
+    """
+    while True:
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                if entry['expires'] > time.monotonic():
+                    _entries.move_to_end(key)
+                    _stats['hits'] += 1
+                    return entry
+                del _entries[key]
+                _stats['expired'] += 1
+
+            waiter = _inflight.get(key)
+            if waiter is None:
+                waiter = _inflight[key] = threading.Event()
+                _stats['misses'] += 1
+                leader = True
+            else:
+                _stats['coalesced'] += 1
+                leader = False
+
+        if not leader:
+            waiter.wait()
+            with _lock:
+                entry = _entries.get(key)
+            if entry is not None:
+                return entry
+            # The leader failed; loop round and compute (or wait on a new leader)
+            continue
+
+        try:
+            result = compute()
+            started = time.perf_counter()
+            with stage(f'serialize.{fmt}'):
+                body, media_type = RENDERERS[fmt](result)
+            entry = {
+                'body': body,
+                'media_type': media_type,
+                'serialize_ms': round((time.perf_counter() - started) * 1000, 3),
+                'expires': time.monotonic() + TTL_SECONDS,
+                'sources': frozenset(sources),
+            }
+            observe('msme_payload_bytes', {'namespace': namespace or 'unknown', 'format': fmt}, len(body), SIZE_BUCKETS)
+            with _lock:
+                _entries[key] = entry
+                while len(_entries) > MAX_ENTRIES:
+                    _entries.popitem(last=False)
+                    _stats['evictions'] += 1
+            return entry
+        finally:
+            with _lock:
+                _inflight.pop(key, None)
+            waiter.set()
+
+
+def _opaque(tag):
+    """Entity tag without its weakness prefix (If-None-Match compares weakly)."""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return _opaque(etag) in [_opaque(tag) for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(if_modified_since).timestamp() >= int(last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_response(request, namespace, params, compute, sources, fmt='json'):
+    """
+    Serve `compute()` rendered as `fmt` (see response_formats) through the result
+    cache, keyed by `params` plus the version of `sources`. Sets ETag/Last-Modified,
+    answers conditional requests with 304 without computing anything, and reports the
+    uncompressed payload size and the time its serialization took.
+    """
+    version, last_modified = source_version(sources)
+    key = _cache_key(namespace, [params, fmt], version)
+    # Weak: CompressionMiddleware may send the same entity gzip-, brotli- or identity-encoded
+    etag = 'W/"' + key[:32] + '"'
+    headers = {
+        'ETag': etag,
+        'Last-Modified': formatdate(last_modified, usegmt=True),
+        'Cache-Control': 'no-cache',
+    }
+
+    if _not_modified(request, etag, last_modified):
+        with _lock:
+            _stats['not_modified'] += 1
+        return Response(status_code=304, headers=headers)
+
+    entry = get_or_compute(key, compute, sources, fmt, namespace)
+    headers['X-Payload-Bytes'] = str(len(entry['body']))
+    headers['Server-Timing'] = f"serialize;dur={entry['serialize_ms']}"
+    return Response(content=entry['body'], media_type=entry['media_type'], headers=headers)
+
+
+def invalidate(sources=None):
+    """
+    Drop every cached result (e.g. after /train rewrote the predictions), or only
+    those computed from any of `sources`. Returns the number of entries dropped.
+    """
+    with _lock:
+        if sources is None:
+            dropped = list(_entries)
+        else:
+            sources = set(sources)
+            dropped = [key for key, entry in _entries.items() if entry['sources'] & sources]
+        for key in dropped:
+            del _entries[key]
+        _stats['invalidations'] += 1
+        return len(dropped)
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_entries), max_entries=MAX_ENTRIES, ttl_seconds=TTL_SECONDS)
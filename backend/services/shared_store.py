@@ -0,0 +1,160 @@
+"""
+Versioned array snapshots that several worker processes map instead of each holding
+its own copy.
+
+With MSME_SHARED_MEMORY=1 the dataset store and the compiled forest are materialized
+once per content version as .npy files (numeric columns as-is, categoricals as codes)
+under MSME_SHARED_DIR (default /dev/shm/msme when available). Every worker attaches
+with np.load(mmap_mode='r'), so the pages live once in the OS page cache. A new
+version (e.g. after /train) is written to a temp directory and renamed into place;
+workers switch on their next freshness check and old versions are pruned (already
+mapped files stay valid until unmapped).
+
+    python -m services.shared_store   # materialize everything before starting workers
+"""
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+
+SHARED_ENABLED = os.environ.get('MSME_SHARED_MEMORY', '0') == '1'
+SHARED_DIR = os.environ.get(
+    'MSME_SHARED_DIR',
+    '/dev/shm/msme' if os.path.isdir('/dev/shm') else os.path.join(os.path.dirname(__file__), '..', 'data', '.cache', 'shared'),
+)
+KEEP_VERSIONS = 2
+
+
+def _snapshot_dir(name, version):
+    return os.path.join(SHARED_DIR, f"{name}-{version[:16]}")
+
+
+@contextmanager
+def build_lock(name):
+    """Cross-process lock so only one worker materializes a given snapshot."""
+    # POSIX only; imported here so the module (and the backend) still imports on
+    # Windows, where shared mode is unavailable
+    import fcntl
+    os.makedirs(SHARED_DIR, exist_ok=True)
+    with open(os.path.join(SHARED_DIR, f"{name}.lock"), 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _prune(name, keep):
+    prefix = f"{name}-"
+    versions = [
+        os.path.join(SHARED_DIR, entry) for entry in os.listdir(SHARED_DIR)
+        if entry.startswith(prefix) and '.tmp' not in entry
+    ]
+    versions.sort(key=os.path.getmtime, reverse=True)
+    for path in versions[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def publish_arrays(name, version, arrays, meta):
+    """Write a snapshot (dict of arrays + JSON meta) and atomically rename it into place."""
+    final = _snapshot_dir(name, version)
+    if os.path.isdir(final):
+        return final
+    tmp = f"{final}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for key, array in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), array, allow_pickle=False)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(dict(meta, arrays=list(arrays)), f)
+    try:
+        os.rename(tmp, final)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune(name, KEEP_VERSIONS)
+    return final
+
+
+def attach_arrays(name, version):
+    """Map a published snapshot read-only; returns (arrays, meta) or None if it does not exist."""
+    path = _snapshot_dir(name, version)
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode='r') for key in meta['arrays']}
+    except (OSError, ValueError):
+        return None
+    return arrays, meta
+
+
+def frame_to_arrays(df):
+    """
+    Split a frame into mappable arrays: numeric columns as-is, categoricals as codes,
+    text as fixed-width unicode plus a missing-value mask when the column has any.
+    """
+    arrays, columns = {}, []
+    for i, col in enumerate(df.columns):
+        key = f"c{i}"
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            arrays[key] = series.cat.codes.to_numpy()
+            columns.append({'name': col, 'key': key, 'kind': 'category',
+                            'categories': series.cat.categories.tolist()})
+        elif pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            arrays[key] = series.to_numpy()
+            columns.append({'name': col, 'key': key, 'kind': 'numeric'})
+        else:
+            missing = series.isna().to_numpy()
+            arrays[key] = series.where(~missing, '').astype(str).to_numpy(dtype=str)
+            column = {'name': col, 'key': key, 'kind': 'text'}
+            if missing.any():
+                arrays[key + '_na'] = missing
+                column['missing'] = key + '_na'
+            columns.append(column)
+    return arrays, {'columns': columns}
+
+
+def arrays_to_frame(arrays, meta):
+    """Rebuild the frame on top of mapped arrays; numeric columns and category codes are not copied."""
+    data = {}
+    for column in meta['columns']:
+        values = arrays[column['key']]
+        if column['kind'] == 'category':
+            dtype = pd.CategoricalDtype(column['categories'])
+            data[column['name']] = pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+        elif column['kind'] == 'numeric':
+            data[column['name']] = values
+        elif 'missing' in column:
+            text = np.asarray(values).astype(object)
+            text[arrays[column['missing']]] = np.nan
+            data[column['name']] = pd.array(text, dtype='str')
+        else:
+            data[column['name']] = pd.array(np.asarray(values), dtype='str')
+    return pd.DataFrame(data, copy=False)
+
+
+def shared_frame(name, version, build):
+    """
+    The table for `version` backed by the shared snapshot, materializing it with
+    `build()` if no worker has yet.
+    """
+    attached = attach_arrays(name, version)
+    if attached is None:
+        with build_lock(name):
+            attached = attach_arrays(name, version)
+            if attached is None:
+                publish_arrays(name, version, *frame_to_arrays(build()))
+                attached = attach_arrays(name, version)
+    return arrays_to_frame(*attached)
+
+
+if __name__ == "__main__":
+    os.environ['MSME_SHARED_MEMORY'] = '1'
+    from services import data_loader
+    from model.forest import load_forest
+    for table in data_loader.TABLE_SOURCES:
+        frame = data_loader._load_table(table)
+        print(f"{table}: {0 if frame is None else len(frame)} rows -> {SHARED_DIR}")
+    print(f"forest: {'shared' if load_forest() is not None else 'not trained yet'}")
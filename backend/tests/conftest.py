@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules import each other from backend/ (`from services.x import y`), as under uvicorn
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
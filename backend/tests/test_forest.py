@@ -0,0 +1,46 @@
+import copy
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from model.forest import SCORE_CHUNK_ROWS, export_forest, forest_predict_proba, load_forest
+
+
+def _fitted_forest(rng, n_features=6):
+    X = rng.normal(size=(2000, n_features)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int) + (X[:, 3] > 1).astype(int)
+    model = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X, y)
+    return model, {'feature_names': [f'f{i}' for i in range(n_features)]}
+
+
+def _scoring_rows(rng, n_features=6):
+    # More than one traversal chunk, and not a multiple of the chunk size
+    return rng.normal(size=(2 * SCORE_CHUNK_ROWS + 123, n_features)).astype(np.float32)
+
+
+def test_exported_forest_matches_sklearn(tmp_path):
+    rng = np.random.default_rng(0)
+    model, pipeline = _fitted_forest(rng)
+    path = str(tmp_path / 'forest.npz')
+    export_forest(model, pipeline, path, rng.normal(size=(50, 6)).astype(np.float32))
+
+    forest = load_forest(path)
+    X = _scoring_rows(rng)
+    assert forest['pipeline'] == pipeline
+    assert np.array_equal(forest_predict_proba(forest, X), model.predict_proba(X))
+
+
+def test_exported_forest_normalizes_class_counts(tmp_path):
+    # Older scikit-learn pickles store class counts per node instead of fractions
+    # and normalize them at predict time, which gives the fitted model's fractions
+    rng = np.random.default_rng(1)
+    model, pipeline = _fitted_forest(rng)
+    reference = copy.deepcopy(model)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        tree.value[:] = np.round(tree.value * tree.weighted_n_node_samples[:, None, None])
+    assert not np.allclose(model.estimators_[0].tree_.value.sum(axis=2), 1.0)
+    model.predict_proba = reference.predict_proba
+
+    path = str(tmp_path / 'forest.npz')
+    export_forest(model, pipeline, path, rng.normal(size=(50, 6)).astype(np.float32))
+    X = _scoring_rows(rng)
+    assert np.array_equal(forest_predict_proba(load_forest(path), X), reference.predict_proba(X))
@@ -0,0 +1,89 @@
+import itertools
+import numpy as np
+import pytest
+from data import knapsack_solver
+from data.knapsack_solver import solve
+
+TRIALS = 200
+
+
+def _random_instance(rng, whole_costs=True):
+    n_msmes, n_pairs = int(rng.integers(1, 6)), int(rng.integers(1, 13))
+    costs = rng.choice([0, 50_000, 100_000, 150_000, 250_000, 400_000], n_pairs).astype(float)
+    if not whole_costs:
+        costs += rng.random(n_pairs).round(2)
+    candidates = {
+        'msme_rows': rng.integers(0, n_msmes, n_pairs),
+        'n_msmes': n_msmes,
+        'Subsidy_Cost': costs,
+    }
+    # Some ties and some worthless pairs, like real weighted scores
+    score = rng.choice([0.0, 0.25, 0.5, 0.75, 1.0], n_pairs) * rng.choice([1.0, 1.0, 0.37], n_pairs)
+    budget = float(rng.choice([0, 100_000, 300_000, 550_000, 1_000_000]))
+    return candidates, score, budget
+
+
+def _brute_force(candidates, score, budget):
+    """Best total score over every way of giving each MSME one of its pairs or nothing."""
+    options = [[None] + np.flatnonzero(candidates['msme_rows'] == m).tolist()
+               for m in range(candidates['n_msmes'])]
+    best = 0.0
+    for pick in itertools.product(*options):
+        chosen = [k for k in pick if k is not None]
+        if candidates['Subsidy_Cost'][chosen].sum() <= budget:
+            best = max(best, score[chosen].sum())
+    return best
+
+
+def _check(candidates, score, budget, selected, info, optimum):
+    msmes = candidates['msme_rows'][selected]
+    assert len(set(msmes.tolist())) == len(selected)
+    assert candidates['Subsidy_Cost'][selected].sum() <= budget
+    assert info['objective'] == pytest.approx(score[selected].sum())
+    assert info['objective'] <= optimum + 1e-9
+    assert info['upper_bound'] >= optimum - 1e-9
+    assert info['lp_bound'] >= optimum - 1e-9
+    if info['status'] == 'optimal':
+        assert info['objective'] == pytest.approx(optimum)
+
+
+def test_exact_solver_matches_brute_force():
+    rng = np.random.default_rng(11)
+    for _ in range(TRIALS):
+        candidates, score, budget = _random_instance(rng)
+        selected, info = solve(candidates, score, budget, 'exact')
+        optimum = _brute_force(candidates, score, budget)
+        _check(candidates, score, budget, selected, info, optimum)
+        assert info['status'] == 'optimal'
+        assert info['optimality_gap'] == 0.0
+
+
+def test_exact_solver_with_coarse_budget_units(monkeypatch):
+    # Fractional costs (no GCD unit) and a tiny DP table both fall back to rounded-up units
+    monkeypatch.setattr(knapsack_solver, 'DP_MAX_CELLS', 16)
+    rng = np.random.default_rng(12)
+    for trial in range(TRIALS):
+        candidates, score, budget = _random_instance(rng, whole_costs=trial % 2 == 0)
+        selected, info = solve(candidates, score, budget, 'exact')
+        _check(candidates, score, budget, selected, info, _brute_force(candidates, score, budget))
+
+
+def test_lp_solver_is_feasible_and_bounded():
+    rng = np.random.default_rng(13)
+    for _ in range(TRIALS):
+        candidates, score, budget = _random_instance(rng)
+        selected, info = solve(candidates, score, budget, 'lp')
+        _check(candidates, score, budget, selected, info, _brute_force(candidates, score, budget))
+        assert 0.0 <= info['optimality_gap'] <= 1.0
+
+
+def test_time_limit_falls_back_to_best_known_selection():
+    rng = np.random.default_rng(14)
+    for _ in range(TRIALS):
+        candidates, score, budget = _random_instance(rng)
+        # A deadline that has already passed stops the DP before its first MSME
+        incumbent = np.flatnonzero(candidates['Subsidy_Cost'] <= budget)[:1]
+        selected, info = solve(candidates, score, budget, 'exact', time_limit=-1.0, incumbent=incumbent)
+        _check(candidates, score, budget, selected, info, _brute_force(candidates, score, budget))
+        assert info['status'] in ('time_limit', 'optimal')
+        assert info['objective'] >= score[incumbent].sum() - 1e-12
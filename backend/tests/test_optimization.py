@@ -0,0 +1,58 @@
+import numpy as np
+from data.optimization_engine import rank_candidates, greedy_select, run_optimization, generate_tradeoff_curve
+
+
+def test_rank_candidates_keeps_candidate_order_on_ties():
+    assert rank_candidates(np.array([1.0, 2.0, 2.0, 1.0, 3.0])).tolist() == [4, 1, 2, 0, 3]
+
+
+def test_jobs_only_allocation_on_bundled_data():
+    # At w_rev=0 a pair's score is its job count, so many pairs tie and the tie
+    # order decides who is funded. Pinned to the candidate-order tie rule.
+    summary = run_optimization(1e8, 0.0, 1.0)['summary']
+    assert summary['Total_MSMEs_Funded'] == 34
+    assert summary['Total_Projected_Jobs_Created'] == 135
+    assert summary['Total_Projected_Revenue_Gain'] == 124844111
+    assert summary['Total_Budget_Spent'] == 98000000.0
+
+
+def test_tradeoff_jobs_only_point_matches_optimize():
+    point = generate_tradeoff_curve(1e8)[0]
+    assert (point['w_rev'], point['w_emp']) == (0.0, 1.0)
+    assert (point['msmes_funded'], point['jobs_created'], point['revenue_gain']) == (34, 135, 124844111)
+
+
+def _row_by_row_greedy(candidates, order, budget):
+    # The original loop: walk the ranked pairs, skip funded MSMEs, fund while affordable
+    remaining, funded, selected, rejected = budget, set(), [], []
+    for pos in order:
+        msme, cost = candidates['msme_rows'][pos], candidates['Subsidy_Cost'][pos]
+        if msme in funded:
+            continue
+        if remaining >= cost:
+            selected.append(pos)
+            remaining -= cost
+            funded.add(msme)
+        else:
+            rejected.append(pos)
+    return selected, rejected, remaining
+
+
+def test_greedy_select_matches_row_by_row_pass():
+    rng = np.random.default_rng(7)
+    for _ in range(300):
+        n_msmes, n_pairs = int(rng.integers(1, 15)), int(rng.integers(1, 60))
+        candidates = {
+            'msme_rows': rng.integers(0, n_msmes, n_pairs),
+            'n_msmes': n_msmes,
+            # Few distinct costs and scores, so equal costs and tied scores are common
+            'Subsidy_Cost': rng.choice([0.0, 1e5, 2.5e5, 5e5, 1e6], n_pairs),
+        }
+        order = rank_candidates(rng.integers(0, 4, n_pairs) / 4)
+        budget = float(rng.choice([0, 1e5, 7.5e5, 2e6, 1e7]))
+        
+        selected, rejected, remaining = greedy_select(candidates, order, budget)
+        expected = _row_by_row_greedy(candidates, order, budget)
+        assert selected.tolist() == expected[0]
+        assert rejected.tolist() == expected[1]
+        assert remaining == expected[2]
@@ -0,0 +1,93 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from services import data_loader
+from model import artifacts, explain
+from model.predict import get_predictor, score_frames
+from model.rescore import rescore_changed
+from model.train import train_model
+
+BUNDLED_DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Bundled datasets and a freshly trained model in tmp_path, served through the usual stores."""
+    data_dir, model_dir = tmp_path / 'data', tmp_path / 'model'
+    data_dir.mkdir()
+    model_dir.mkdir()
+    for name in ('MSME_Project_Data.xlsx', 'Scheme_Dataset_Final.xlsx'):
+        shutil.copy(os.path.join(BUNDLED_DATA, name), data_dir / name)
+
+    msme_base = str(data_dir / 'MSME_Project_Data')
+    monkeypatch.setattr(data_loader, 'TABLE_SOURCES', {
+        'msme': [msme_base + '.parquet', msme_base + '.xlsx'],
+        'predictions': [str(data_dir / 'MSME_WITH_PREDICTIONS.parquet')],
+        'schemes': [str(data_dir / 'Scheme_Dataset_Final.xlsx')],
+    })
+    monkeypatch.setattr(data_loader, 'CACHE_DIR', str(data_dir / '.cache'))
+    monkeypatch.setattr(data_loader, 'PREDICTED_DATA_PATH', str(data_dir / 'MSME_WITH_PREDICTIONS.parquet'))
+    monkeypatch.setattr(data_loader, 'PREDICTED_XLSX_PATH', str(data_dir / 'MSME_WITH_PREDICTIONS.xlsx'))
+    monkeypatch.setattr(data_loader, '_store', {})
+    monkeypatch.setattr(artifacts, 'MODEL_DIR', str(model_dir))
+    monkeypatch.setattr(artifacts, 'VERSIONS_DIR', str(model_dir / 'versions'))
+    monkeypatch.setattr(artifacts, 'CURRENT_PATH', str(model_dir / 'CURRENT'))
+    monkeypatch.setattr(explain, '_store', {'stamp': None, 'values': None, 'meta': None})
+
+    train_model()
+    return msme_base + '.parquet'
+
+
+def _edit_msmes(msme_path):
+    """Change three rows (numeric and categorical), remove two and append one new MSME."""
+    df = data_loader.load_msme_data().copy()
+    for col in data_loader.CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(object)
+    df.loc[3, 'Annual_Revenue'] *= 3
+    df.loc[10, 'Annual_Revenue'] = df['Annual_Revenue'].min()
+    df.loc[25, 'Sector'] = df.loc[26, 'Sector'] if df.loc[26, 'Sector'] != df.loc[25, 'Sector'] else df.loc[40, 'Sector']
+    new = df.iloc[[50]].assign(MSME_ID='MSME_TEST_NEW', Annual_Revenue=df['Annual_Revenue'].max())
+    df = pd.concat([df.drop(index=[5, 60]), new], ignore_index=True)
+    df.to_parquet(msme_path, index=False)
+    return df
+
+
+def test_rescore_matches_full_scoring(workspace):
+    _edit_msmes(workspace)
+    summary = rescore_changed()
+    assert summary['written']
+    assert (summary['changed'], summary['new'], summary['removed']) == (3, 1, 2)
+
+    msme_df = data_loader.load_msme_data()
+    model, pipeline = get_predictor()
+    full = next(score_frames(model, pipeline, [msme_df]))
+    rescored = data_loader.load_predicted_data()
+    assert rescored['MSME_ID'].tolist() == full['MSME_ID'].tolist()
+    assert np.array_equal(rescored['Growth_Score'].to_numpy(), full['Growth_Score'].to_numpy())
+    assert rescored['Predicted_Growth_Category'].astype(str).tolist() == full['Predicted_Growth_Category'].astype(str).tolist()
+
+    # Nothing changed since, so a second pass writes nothing
+    assert rescore_changed()['written'] is False
+
+
+def test_rescore_carries_explanations_over(workspace, monkeypatch):
+    # shap stand-in: per-row contributions that depend only on that row's features
+    def contributions(model, X, out, workers=None, progress=None):
+        out[:] = np.asarray(X, dtype=np.float32) * np.arange(1, X.shape[1] + 1, dtype=np.float32)
+    monkeypatch.setattr(explain, 'compute_shap_values', contributions)
+    monkeypatch.setattr(explain, '_require_shap', lambda: None)
+    monkeypatch.setattr(explain, '_expected_growth_score', lambda model: 0.0)
+
+    explain.build_explanations()
+    _edit_msmes(workspace)
+    assert rescore_changed()['explanations'] == 'updated'
+    carried, meta = explain.get_explanation_store()
+    carried = np.array(carried)
+
+    explain.build_explanations()
+    rebuilt, rebuilt_meta = explain.get_explanation_store()
+    assert meta == rebuilt_meta
+    assert np.array_equal(carried, np.asarray(rebuilt))
@@ -45,7 +45,17 @@ export default function Dashboard() {
         setLoading(true);
         setError('');
         try {
-            const response = await axios.get(`${API_URL}/train`);
+            // Training runs as a background job: start it, then poll until it finishes
+            const { data: job } = await axios.post(`${API_URL}/train`);
+            let status = job;
+            while (status.status === 'queued' || status.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                status = (await axios.get(`${API_URL}${job.status_url}`)).data;
+            }
+            if (status.status === 'failed') {
+                throw new Error(status.error || 'Training failed');
+            }
+            const response = await axios.get(`${API_URL}${job.result_url}`);
             setMetrics(response.data);
         } catch (err) {
             setError(err.message || 'Error training model');
@@ -60,7 +60,7 @@ export default function DetailPage() {
 
     if (!msme) return null;
 
-    const { original_data, predicted_category, growth_score, top_important_features } = msme;
+    const { original_data, predicted_category, growth_score, top_important_features, top_drivers } = msme;
 
     const getScoreColor = (score) => {
         if (score < 40) return 'text-red-600';
@@ -175,6 +175,23 @@ export default function DetailPage() {
                             ))}
                         </div>
                     </div>
+
+                    {top_drivers && (
+                        <div className="bg-white p-6 rounded-2xl shadow-sm border border-gray-100">
+                            <h3 className="text-xl font-bold text-gray-800 mb-1 border-b border-gray-100 pb-3">Growth Score Drivers (this MSME)</h3>
+                            <p className="text-xs text-gray-500 mb-4">Points added to or removed from the average score of {top_drivers.base_value.toFixed(1)}</p>
+                            <div className="space-y-2">
+                                {top_drivers.drivers.map(({ feature, contribution }) => (
+                                    <div key={feature} className="flex justify-between items-center">
+                                        <span className="text-sm font-semibold text-gray-700">{feature.replace(/_/g, ' ')}</span>
+                                        <span className={`text-sm font-bold px-2 py-0.5 rounded ${contribution >= 0 ? 'text-green-700 bg-green-50' : 'text-red-700 bg-red-50'}`}>
+                                            {contribution >= 0 ? '+' : ''}{contribution.toFixed(1)}
+                                        </span>
+                                    </div>
+                                ))}
+                            </div>
+                        </div>
+                    )}
                 </div>
             </div>
 
@@ -8,6 +8,9 @@ import styles from './OptimizationDashboard.module.css';
 
 ChartJS.register(CategoryScale, LinearScale, PointElement, LineElement, Title, Tooltip, Legend);
 
+// Rejected pairs listed in the table; the tab badge shows the full count
+const REJECTED_PAGE_SIZE = 200;
+
 const OptimizationDashboard = () => {
     const [budget, setBudget] = useState(100000000);
     const [wRev, setWRev] = useState(0.5);
@@ -27,7 +30,10 @@ const OptimizationDashboard = () => {
                 params: {
                     budget: budget,
                     w_rev: wRev,
-                    w_emp: wEmp
+                    w_emp: wEmp,
+                    // Counts per reason/sector plus only the first page of rejected rows
+                    rejections: 'summary',
+                    rejected_limit: REJECTED_PAGE_SIZE
                 }
             });
             setResults(response.data);
@@ -66,7 +72,7 @@ const OptimizationDashboard = () => {
     useEffect(() => {
         const fetchTradeoff = async () => {
             try {
-                const res = await axios.get(`${import.meta.env.VITE_API_URL || 'http://localhost:8000'}/optimize/tradeoff`, { params: { budget } });
+                const res = await axios.get(`${import.meta.env.VITE_API_URL || 'http://localhost:8000'}/optimize/tradeoff`, { params: { budget, points: 101 } });
                 setTradeoffData(res.data);
             } catch (err) {
                 console.error("Tradeoff fetch error", err);
@@ -91,7 +97,7 @@ const OptimizationDashboard = () => {
                 pointBackgroundColor: '#ffffff',
                 pointBorderColor: '#4f46e5',
                 pointBorderWidth: 2,
-                pointRadius: 6,
+                pointRadius: tradeoffData.map(d => (d.pareto_optimal ? 5 : 2)),
                 pointHoverRadius: 8,
                 tension: 0.3,
                 showLine: true
@@ -312,7 +318,7 @@ const OptimizationDashboard = () => {
                                         <XCircle size={16} />
                                         Not Allocated
                                         <span className={`${styles.tabBadge} ${activeTab === 'rejected' ? styles.badgeRejected : styles.badgeInactive}`}>
-                                            {results.rejected.length}
+                                            {results.rejected_page ? results.rejected_page.total : results.rejected.length}
                                         </span>
                                     </button>
                                 </div>
@@ -398,28 +404,37 @@ const OptimizationDashboard = () => {
                                                             </td>
                                                         </tr>
                                                     ) : (
-                                                        results.rejected.map((alloc, idx) => (
-                                                            <tr key={`rej-${idx}`}>
-                                                                <td>
-                                                                    <div className={styles.msmeId} style={{ color: '#475569' }}>{alloc.MSME_ID}</div>
-                                                                    <div className="text-xs font-semibold text-slate-500 mt-1">{alloc.Sector}</div>
-                                                                </td>
-                                                                <td>
-                                                                    <div className={styles.schemeName} style={{ color: '#64748b' }}>{alloc.Scheme_Name}</div>
-                                                                </td>
-                                                                <td style={{ textAlign: 'center' }}>
-                                                                    <span className={styles.scoreBox}>
-                                                                        {(alloc.Optimization_Score * 100).toFixed(2)}
-                                                                    </span>
-                                                                </td>
-                                                                <td>
-                                                                    <span className={styles.statusFail}>
-                                                                        <XCircle size={16} strokeWidth={2.5} />
-                                                                        {alloc.Reason}
-                                                                    </span>
-                                                                </td>
-                                                            </tr>
-                                                        ))
+                                                        <>
+                                                            {results.rejected.map((alloc, idx) => (
+                                                                <tr key={`rej-${idx}`}>
+                                                                    <td>
+                                                                        <div className={styles.msmeId} style={{ color: '#475569' }}>{alloc.MSME_ID}</div>
+                                                                        <div className="text-xs font-semibold text-slate-500 mt-1">{alloc.Sector}</div>
+                                                                    </td>
+                                                                    <td>
+                                                                        <div className={styles.schemeName} style={{ color: '#64748b' }}>{alloc.Scheme_Name}</div>
+                                                                    </td>
+                                                                    <td style={{ textAlign: 'center' }}>
+                                                                        <span className={styles.scoreBox}>
+                                                                            {(alloc.Optimization_Score * 100).toFixed(2)}
+                                                                        </span>
+                                                                    </td>
+                                                                    <td>
+                                                                        <span className={styles.statusFail}>
+                                                                            <XCircle size={16} strokeWidth={2.5} />
+                                                                            {alloc.Reason}
+                                                                        </span>
+                                                                    </td>
+                                                                </tr>
+                                                            ))}
+                                                            {results.rejected_page && results.rejected_page.total > results.rejected.length && (
+                                                                <tr>
+                                                                    <td colSpan="4" className="text-center py-4 text-slate-500 text-sm">
+                                                                        Showing the top {results.rejected.length} of {results.rejected_page.total} rejected pairs.
+                                                                    </td>
+                                                                </tr>
+                                                            )}
+                                                        </>
                                                     )}
                                                 </tbody>
                                             </>
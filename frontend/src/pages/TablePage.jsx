@@ -4,25 +4,33 @@ import { Link } from 'react-router-dom';
 import { Search, ChevronRight } from 'lucide-react';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+const PAGE_SIZE = 50;
+const TABLE_FIELDS = 'MSME_ID,Sector,Annual_Revenue,Predicted_Growth_Category,Growth_Score';
 
 export default function TablePage() {
     const [msmes, setMsmes] = useState([]);
     const [loading, setLoading] = useState(true);
     const [searchTerm, setSearchTerm] = useState('');
+    const [offset, setOffset] = useState(0);
+    const [total, setTotal] = useState(0);
 
     useEffect(() => {
-        const fetchMsmes = async () => {
+        // Filtering and paging happen server-side; debounce so typing doesn't fire a request per key
+        const timer = setTimeout(async () => {
             try {
-                const response = await axios.get(`${API_URL}/msmes`);
+                const response = await axios.get(`${API_URL}/msmes`, {
+                    params: { limit: PAGE_SIZE, offset, fields: TABLE_FIELDS, q: searchTerm || undefined }
+                });
                 setMsmes(response.data);
+                setTotal(Number(response.headers['x-total-count'] || response.data.length));
             } catch (error) {
                 console.error('Error fetching data:', error);
             } finally {
                 setLoading(false);
             }
-        };
-        fetchMsmes();
-    }, []);
+        }, 200);
+        return () => clearTimeout(timer);
+    }, [offset, searchTerm]);
 
     const getScoreColor = (score) => {
         if (score < 40) return 'bg-red-100 text-red-800 border-red-200';
@@ -36,11 +44,6 @@ export default function TablePage() {
         return 'text-green-600 font-medium';
     };
 
-    const filteredMsmes = msmes.filter(m =>
-        m.MSME_ID.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        m.Sector.toLowerCase().includes(searchTerm.toLowerCase())
-    );
-
     return (
         <div className="bg-white rounded-xl shadow-sm border border-gray-100 overflow-hidden">
             <div className="p-6 border-b border-gray-100 flex justify-between items-center bg-gray-50/50">
@@ -57,7 +60,7 @@ export default function TablePage() {
                         type="text"
                         placeholder="Search ID or Sector..."
                         value={searchTerm}
-                        onChange={(e) => setSearchTerm(e.target.value)}
+                        onChange={(e) => { setSearchTerm(e.target.value); setOffset(0); }}
                         className="pl-10 pr-4 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-indigo-500 focus:border-indigo-500 w-64 shadow-sm"
                     />
                 </div>
@@ -82,7 +85,7 @@ export default function TablePage() {
                             </tr>
                         </thead>
                         <tbody className="bg-white divide-y divide-gray-200">
-                            {filteredMsmes.map((msme) => (
+                            {msmes.map((msme) => (
                                 <tr key={msme.MSME_ID} className="hover:bg-indigo-50/50 transition-colors cursor-pointer group">
                                     <td className="px-6 py-4 whitespace-nowrap">
                                         <div className="flex items-center">
@@ -123,7 +126,7 @@ export default function TablePage() {
                                 </tr>
                             ))}
 
-                            {filteredMsmes.length === 0 && (
+                            {msmes.length === 0 && (
                                 <tr>
                                     <td colSpan="6" className="px-6 py-12 text-center text-gray-500">
                                         No MSMEs found matching "{searchTerm}"
@@ -134,6 +137,28 @@ export default function TablePage() {
                     </table>
                 )}
             </div>
+
+            {total > PAGE_SIZE && (
+                <div className="px-6 py-4 border-t border-gray-100 flex justify-between items-center text-sm text-gray-600">
+                    <span>Showing {offset + 1}-{Math.min(offset + PAGE_SIZE, total)} of {total}</span>
+                    <div className="space-x-2">
+                        <button
+                            onClick={() => setOffset(Math.max(offset - PAGE_SIZE, 0))}
+                            disabled={offset === 0}
+                            className="px-3 py-1.5 rounded-md border border-gray-300 disabled:opacity-40 hover:bg-gray-50"
+                        >
+                            Previous
+                        </button>
+                        <button
+                            onClick={() => setOffset(offset + PAGE_SIZE)}
+                            disabled={offset + PAGE_SIZE >= total}
+                            className="px-3 py-1.5 rounded-md border border-gray-300 disabled:opacity-40 hover:bg-gray-50"
+                        >
+                            Next
+                        </button>
+                    </div>
+                </div>
+            )}
         </div>
     );
 }